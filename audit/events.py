@@ -0,0 +1,137 @@
+import atexit
+import datetime
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from django_tenants.utils import schema_context
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+
+def month_bounds(moment):
+    start = moment.astimezone(datetime.timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0,
+    )
+    end = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def ensure_partition(moment):
+    """Create the month partition holding moment in the current schema."""
+    start, end = month_bounds(moment)
+    table = AuditEvent._meta.db_table
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {table}_y{start:%Y}m{start:%m} '
+                f'PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+                [start, end],
+            )
+    except DatabaseError as e:
+        # e.g. rows for that month already sit in the default partition
+        logger.warning('Could not create audit partition for %s: %s', start, e)
+
+
+class AuditBuffer:
+    """
+    Per-process event buffer flushed by a background thread with bulk_create,
+    when AUDIT_FLUSH_SIZE events are waiting, every AUDIT_FLUSH_INTERVAL
+    seconds and at interpreter exit.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.pid = None
+        # (schema_name, month start) pairs whose partition exists
+        self.partitions = set()
+
+    def add(self, schema_name, event):
+        with self.lock:
+            self.events.append((schema_name, event))
+            size = len(self.events)
+        self.start()
+        if size >= settings.AUDIT_FLUSH_SIZE:
+            self.wakeup.set()
+
+    def start(self):
+        # started lazily so forked workers each get their own thread
+        if self.thread is not None and self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.run, name='audit-writer', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(settings.AUDIT_FLUSH_INTERVAL)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            events, self.events = self.events, []
+        if not events:
+            return
+
+        by_schema = defaultdict(list)
+        for schema_name, event in events:
+            by_schema[schema_name].append(event)
+
+        for schema_name, batch in by_schema.items():
+            try:
+                self.write(schema_name, batch)
+            except DatabaseError:
+                logger.exception('Writing %s audit events for %s failed', len(batch), schema_name)
+                self.requeue(schema_name, batch)
+        connection.close()
+
+    def write(self, schema_name, batch):
+        with schema_context(schema_name):
+            for moment in {month_bounds(event.created_at)[0] for event in batch}:
+                if (schema_name, moment) not in self.partitions:
+                    ensure_partition(moment)
+                    self.partitions.add((schema_name, moment))
+            AuditEvent.objects.bulk_create(batch, batch_size=500)
+
+    def requeue(self, schema_name, batch):
+        with self.lock:
+            room = settings.AUDIT_MAX_BUFFER - len(self.events)
+            if room < len(batch):
+                logger.error('Dropping %s audit events for %s', len(batch) - max(room, 0), schema_name)
+            self.events[:0] = [(schema_name, event) for event in batch[:max(room, 0)]]
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.flush)
+
+
+def record(request, action, target=None, actor=None, **data):
+    """
+    Queue an audit event for the current tenant, returns immediately.
+    actor defaults to request.user, pass it when the user is already logged out.
+    """
+    actor = actor or request.user
+    ip_address = request.META.get('REMOTE_ADDR') or None
+    event = AuditEvent(
+        created_at=timezone.now(),
+        actor_id=actor.pk if actor.is_authenticated else None,
+        actor=actor.get_username() if actor.is_authenticated else '',
+        action=action,
+        object_type=target._meta.label_lower if target is not None else '',
+        object_id=str(target.pk) if target is not None else '',
+        data=data,
+        ip_address=ip_address,
+    )
+    buffer.add(connection.schema_name, event)
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Postgres needs the partition key in the primary key, hence (id, created_at).
+# Monthly partitions are added by audit.events.ensure_partition, the default
+# partition catches anything written before its month exists.
+CREATE_PARTITIONED_TABLE = """
+CREATE TABLE audit_auditevent (
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    created_at timestamp with time zone NOT NULL,
+    actor_id bigint NULL,
+    actor varchar(150) NOT NULL,
+    action varchar(50) NOT NULL,
+    object_type varchar(50) NOT NULL,
+    object_id varchar(64) NOT NULL,
+    data jsonb NOT NULL,
+    ip_address inet NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE audit_auditevent_default PARTITION OF audit_auditevent DEFAULT;
+CREATE INDEX audit_created_idx ON audit_auditevent (created_at DESC, id DESC);
+CREATE INDEX audit_actor_idx ON audit_auditevent (actor_id, created_at DESC);
+"""
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql=CREATE_PARTITIONED_TABLE,
+                    reverse_sql="DROP TABLE audit_auditevent CASCADE;",
+                ),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='AuditEvent',
+                    fields=[
+                        ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                        ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('actor_id', models.BigIntegerField(blank=True, null=True)),
+                        ('actor', models.CharField(blank=True, max_length=150)),
+                        ('action', models.CharField(max_length=50)),
+                        ('object_type', models.CharField(blank=True, max_length=50)),
+                        ('object_id', models.CharField(blank=True, max_length=64)),
+                        ('data', models.JSONField(blank=True, default=dict)),
+                        ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['-created_at', '-id'], name='audit_created_idx'), models.Index(fields=['actor_id', '-created_at'], name='audit_actor_idx')],
+                    },
+                ),
+            ],
+        ),
+    ]
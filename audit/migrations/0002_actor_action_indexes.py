@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['actor', '-created_at', '-id'], name='audit_actor_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['action', '-created_at', '-id'], name='audit_action_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import models
+from django.utils import timezone
+
+
+class AuditEvent(models.Model):
+    # the table is range partitioned by month on created_at, see 0001_initial
+    id = models.BigAutoField(primary_key=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    actor = models.CharField(max_length=150, blank=True)
+    action = models.CharField(max_length=50)
+    object_type = models.CharField(max_length=50, blank=True)
+    object_id = models.CharField(max_length=64, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='audit_created_idx'),
+            models.Index(fields=['actor_id', '-created_at'], name='audit_actor_idx'),
+            # the log view's actor and action filters, in the keyset order
+            models.Index(fields=['actor', '-created_at', '-id'], name='audit_actor_name_idx'),
+            models.Index(fields=['action', '-created_at', '-id'], name='audit_action_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.created_at:%Y-%m-%d %H:%M} {self.actor} {self.action}'
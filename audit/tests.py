@@ -0,0 +1,146 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.test.client import TenantClient
+from .events import AuditBuffer, ensure_partition
+from .models import AuditEvent
+
+
+def at(*args):
+    return datetime.datetime(*args, tzinfo=datetime.timezone.utc)
+
+
+def event(action='login', created_at=None):
+    return AuditEvent(action=action, created_at=created_at or at(2026, 10, 1))
+
+
+# flush closes the thread's connection when done, keep it away from the test database
+@mock.patch('audit.events.connection')
+class AuditBufferTests(SimpleTestCase):
+
+    def setUp(self):
+        self.buffer = AuditBuffer()
+        self.written = []
+
+    def write(self, schema_name, batch):
+        self.written.append((schema_name, [e.action for e in batch]))
+
+    def test_flush_groups_by_schema(self, connection):
+        self.buffer.events = [('amass', event('a1')), ('other', event('o1')), ('amass', event('a2'))]
+        with mock.patch.object(self.buffer, 'write', self.write):
+            self.buffer.flush()
+        self.assertEqual(self.written, [('amass', ['a1', 'a2']), ('other', ['o1'])])
+        self.assertEqual(self.buffer.events, [])
+
+    def test_failed_batch_is_requeued(self, connection):
+        def write(schema_name, batch):
+            if schema_name == 'other':
+                raise DatabaseError('connection refused')
+            self.write(schema_name, batch)
+
+        self.buffer.events = [('amass', event('a1')), ('other', event('o1')), ('other', event('o2'))]
+        with mock.patch.object(self.buffer, 'write', write), self.assertLogs('audit.events', 'ERROR'):
+            self.buffer.flush()
+        self.assertEqual(self.written, [('amass', ['a1'])])
+        self.assertEqual([(s, e.action) for s, e in self.buffer.events], [('other', 'o1'), ('other', 'o2')])
+
+    @override_settings(AUDIT_MAX_BUFFER=2)
+    def test_requeue_drops_events_over_the_limit(self, connection):
+        def write(schema_name, batch):
+            # recorded while the batch was being written
+            self.buffer.events.append(('amass', event('new')))
+            raise DatabaseError('connection refused')
+
+        self.buffer.events = [('amass', event('a1')), ('amass', event('a2')), ('amass', event('a3'))]
+        with mock.patch.object(self.buffer, 'write', write), self.assertLogs('audit.events', 'ERROR') as logs:
+            self.buffer.flush()
+        self.assertIn('Dropping 2 audit events for amass', logs.output[-1])
+        # the oldest events are kept, ahead of the newer ones
+        self.assertEqual([e.action for s, e in self.buffer.events], ['a1', 'new'])
+
+
+class PartitionTests(TenantTestCase):
+
+    def partitions(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT inhrelid::regclass::text FROM pg_inherits "
+                "WHERE inhparent = 'audit_auditevent'::regclass"
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def partition_of(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM audit_auditevent WHERE id = %s', [event.id])
+            return cursor.fetchone()[0]
+
+    def test_ensure_partition(self):
+        ensure_partition(at(2031, 3, 15, 12))
+        ensure_partition(at(2031, 3, 1))
+        self.assertIn('audit_auditevent_y2031m03', self.partitions())
+
+        march = AuditEvent.objects.create(action='login', created_at=at(2031, 3, 31, 23, 59))
+        april = AuditEvent.objects.create(action='login', created_at=at(2031, 4, 1))
+        self.assertEqual(self.partition_of(march), 'audit_auditevent_y2031m03')
+        self.assertEqual(self.partition_of(april), 'audit_auditevent_default')
+
+    def test_month_with_rows_in_default_partition(self):
+        AuditEvent.objects.create(action='login', created_at=at(2032, 1, 10))
+        with self.assertLogs('audit.events', 'WARNING'):
+            ensure_partition(at(2032, 1, 1))
+        self.assertEqual(self.partitions(), {'audit_auditevent_default'})
+
+    def test_write_creates_partitions_once(self):
+        buffer = AuditBuffer()
+        batch = [event('a1', at(2033, 5, 2)), event('a2', at(2033, 6, 2))]
+        with mock.patch('audit.events.ensure_partition', wraps=ensure_partition) as ensure:
+            buffer.write('test', batch)
+            buffer.write('test', [event('a3', at(2033, 5, 3))])
+        self.assertEqual(ensure.call_count, 2)
+        self.assertEqual(self.partitions() - {'audit_auditevent_default'}, {
+            'audit_auditevent_y2033m05', 'audit_auditevent_y2033m06',
+        })
+        self.assertEqual(AuditEvent.objects.count(), 3)
+
+
+class AuditLogViewTests(TenantTestCase):
+
+    def setUp(self):
+        self.client = TenantClient(self.tenant)
+        self.client.force_login(User.objects.create_user('head', is_staff=True))
+
+    def pages(self, **params):
+        ids, before = [], None
+        with mock.patch('audit.views.PAGE_SIZE', 2):
+            while True:
+                response = self.client.get(reverse('audit-log'), {**params, 'before': before or ''})
+                ids.append([e.id for e in response.context['events']])
+                before = response.context['next_cursor']
+                if not before:
+                    return ids
+
+    def test_cursor_pages_through_equal_timestamps(self):
+        same = at(2026, 10, 5, 9, 30)
+        events = [AuditEvent.objects.create(action='login', created_at=same) for _ in range(5)]
+        events.append(AuditEvent.objects.create(action='login', created_at=at(2026, 10, 4)))
+
+        expected = [e.id for e in sorted(events, key=lambda e: (e.created_at, e.id), reverse=True)]
+        pages = self.pages()
+        self.assertEqual([len(page) for page in pages], [2, 2, 2])
+        self.assertEqual([pk for page in pages for pk in page], expected)
+
+    def test_cursor_keeps_filters(self):
+        for action in ['login', 'logout', 'login', 'login']:
+            AuditEvent.objects.create(action=action, created_at=at(2026, 10, 5))
+        pages = self.pages(action='login')
+        self.assertEqual(sum(len(page) for page in pages), 3)
+
+    def test_bad_cursor_starts_at_newest(self):
+        AuditEvent.objects.create(action='login')
+        response = self.client.get(reverse('audit-log'), {'before': 'nonsense'})
+        self.assertEqual(len(response.context['events']), 1)
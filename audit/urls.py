@@ -0,0 +1,6 @@
+from django.urls import path
+from audit.views import *
+
+urlpatterns = [
+    path('', audit_log_view, name="audit-log"),
+]
@@ -0,0 +1,48 @@
+import datetime
+
+from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Q
+from .models import AuditEvent
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(event):
+    return f'{event.created_at.isoformat()}|{event.id}'
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, event_id = cursor.rsplit('|', 1)
+        return datetime.datetime.fromisoformat(created_at), int(event_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+@staff_member_required
+def audit_log_view(request):
+    # keyset pagination on (created_at, id), served by audit_created_idx or,
+    # when filtered, by audit_action_idx / audit_actor_name_idx
+    events = AuditEvent.objects.order_by('-created_at', '-id')
+    if request.GET.get('action'):
+        events = events.filter(action=request.GET['action'])
+    if request.GET.get('actor'):
+        events = events.filter(actor=request.GET['actor'])
+
+    cursor = decode_cursor(request.GET.get('before'))
+    if cursor:
+        created_at, event_id = cursor
+        events = events.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=event_id))
+
+    page = list(events[:PAGE_SIZE + 1])
+    next_cursor = encode_cursor(page[PAGE_SIZE - 1]) if len(page) > PAGE_SIZE else None
+    context = {
+        'events': page[:PAGE_SIZE],
+        'next_cursor': next_cursor,
+        'action': request.GET.get('action', ''),
+        'actor': request.GET.get('actor', ''),
+    }
+    if request.htmx:
+        return render(request, 'partials/audit_rows.html', context)
+    return render(request, 'audit/log.html', context)
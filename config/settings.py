@@ -44,6 +44,7 @@ SHARED_APPS = [
     # My apps
     'home',
     'users',
+    'audit',
     
     # Third party
     'django_browser_reload',
@@ -63,6 +64,8 @@ TENANT_APPS = [
     # My apps
     'home',
     'users',
+    'audit',
+    'gradebook',
 ]
 
 INSTALLED_APPS = list(SHARED_APPS) + [app for app in TENANT_APPS if app not in SHARED_APPS]
@@ -73,6 +76,7 @@ SITE_ID = 1
 
 MIDDLEWARE = [
     'django_tenants.middleware.main.TenantMainMiddleware',
+    'school_manager.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,6 +86,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'django_htmx.middleware.HtmxMiddleware',
+    'school_manager.profiling.ProfilerMiddleware',
 ]
 if DEBUG:
     MIDDLEWARE += ['django_browser_reload.middleware.BrowserReloadMiddleware']
@@ -99,8 +104,13 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [ BASE_DIR / 'templates' ],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': [
+                ('home.loaders.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -112,6 +122,10 @@ TEMPLATES = [
     },
 ]
 
+# Per-school template overrides, e.g. tenant_templates/<schema_name>/includes/header.html
+TENANT_TEMPLATES_DIR = BASE_DIR / 'tenant_templates'
+TENANT_TEMPLATES_CHECK_INTERVAL = 5  # seconds between checks for changed overrides
+
 WSGI_APPLICATION = 'config.wsgi.application'
 
 
@@ -128,7 +142,24 @@ DATABASES = {
     }
 }
 
-DATABASE_ROUTERS = ( 'django_tenants.routers.TenantSyncRouter',)
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Seconds a client keeps reading from the primary after it wrote
+REPLICA_PIN_SECONDS = 5
+
+DATABASE_ROUTERS = (
+    'django_tenants.routers.TenantSyncRouter',
+    'school_manager.routers.ReplicaRouter',
+)
 
 TENANT_MODEL = "school_manager.School"  # app.Model
 TENANT_DOMAIN_MODEL = "school_manager.Domain"  # app.Model
@@ -174,6 +205,14 @@ MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 MULTITENANT_RELATIVE_MEDIA_ROOT = 'tenants/%s'
 
+# Chunked uploads, see home.uploads
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # below DATA_UPLOAD_MAX_MEMORY_SIZE
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+UPLOAD_MAX_IMAGE_DIMENSION = 4096
+UPLOAD_IMAGE_FORMATS = ['JPEG', 'PNG', 'GIF', 'WEBP']
+# uploads not attached to a form within this many seconds are deleted by clear_stale_uploads
+UPLOAD_SESSION_MAX_AGE = 24 * 60 * 60
+
 # "BACKEND": "django_tenants.files.storage.TenantFileSystemStorage",
 
 STORAGES = {
@@ -192,6 +231,28 @@ LOGIN_REDIRECT_URL = '/'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 ACCOUNT_LOGIN_METHODS = {'email', 'username'}
 ACCOUNT_SIGNUP_FIELDS = ['email*', 'username*', 'password1*', 'password2*']
+ACCOUNT_ADAPTER = 'users.adapters.AccountAdapter'
+
+
+PROJECT_TITLE = "TTEK ScholarHub"
+
+# AI generated report comments (google-generativeai)
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+AI_MODEL_NAME = os.environ.get('AI_MODEL_NAME', 'gemini-1.5-flash')
+AI_MAX_CONCURRENCY = 4  # in flight per tenant
+AI_REQUESTS_PER_MINUTE = 60  # per tenant
+AI_TIMEOUT = 30
+
+# Report card jobs still pending or running after this many seconds are failed
+REPORT_CARD_JOB_TIMEOUT = 30 * 60
+
+
+# On demand request profiling for superusers (X-Profile header or ?_profile)
+PROFILER_BUFFER_SIZE = 50
+PROFILER_TOP_FUNCTIONS = 60
 
 
-PROJECT_TITLE = "TTEK ScholarHub"
\ No newline at end of file
+# Audit events are buffered per process and written in batches
+AUDIT_FLUSH_SIZE = 200  # events
+AUDIT_FLUSH_INTERVAL = 5  # seconds
+AUDIT_MAX_BUFFER = 10000  # events kept while the database is unavailable
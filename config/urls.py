@@ -10,6 +10,8 @@ urlpatterns = [
     path('accounts/', include('allauth.urls')),
     path('', include('home.urls')),
     path('profile/', include('users.urls')),
+    path('audit/', include('audit.urls')),
+    path('gradebook/', include('gradebook.urls')),
     path('@<username>/', profile_view, name="profile"),
 ]
 
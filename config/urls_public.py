@@ -13,6 +13,7 @@ urlpatterns = [
     path('accounts/', include('allauth.urls')),
     path('', include('home.urls')),
     path('profile/', include('users.urls')),
+    path('audit/', include('audit.urls')),
     path('@<username>/', profile_view, name="profile"),
 ]
 
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import *
+
+
+admin.site.register(Subject)
+admin.site.register(Student)
+admin.site.register(Assessment)
+admin.site.register(TermResult)
+admin.site.register(ReportCardJob)
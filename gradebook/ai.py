@@ -0,0 +1,164 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from .models import AIResponse
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(f'{settings.AI_MODEL_NAME}\n{prompt}'.encode()).hexdigest()
+
+
+def get_model():
+    """The configured Gemini model, or None when the API is not available."""
+    if genai is None or not settings.GEMINI_API_KEY:
+        return None
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    return genai.GenerativeModel(settings.AI_MODEL_NAME)
+
+
+class RateLimiter:
+    """
+    Spaces out request starts per tenant across every batch in this process.
+    """
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def delay(self, key):
+        """Reserve the next slot for key and return how long to wait for it."""
+        if not self.interval:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(key, 0))
+            self.next_slot[key] = slot + self.interval
+        return slot - now
+
+
+class ConcurrencyLimiter:
+    """
+    Caps requests in flight per tenant across every batch in this process.
+    Each batch runs in its own event loop, so slots are thread semaphores
+    polled from the loop rather than asyncio ones.
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def semaphore(self, key):
+        with self.lock:
+            if key not in self.semaphores:
+                self.semaphores[key] = threading.BoundedSemaphore(self.limit)
+            return self.semaphores[key]
+
+    @contextlib.asynccontextmanager
+    async def slot(self, key):
+        semaphore = self.semaphore(key)
+        while not semaphore.acquire(blocking=False):
+            await asyncio.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+rate_limiter = RateLimiter(settings.AI_REQUESTS_PER_MINUTE)
+concurrency_limiter = ConcurrencyLimiter(settings.AI_MAX_CONCURRENCY)
+
+
+class CommentGenerator:
+    """
+    Generate texts for many prompts at once.
+
+    Identical prompts are sent once and answers are cached by prompt hash in
+    AIResponse. Misses run concurrently under a per-tenant concurrency and
+    rate limit; anything that fails or times out gets the caller's fallback
+    and is not cached.
+    """
+
+    def __init__(self, model=None, concurrency=None, limiter=None):
+        self.model = model if model is not None else get_model()
+        self.concurrency = concurrency or concurrency_limiter
+        self.limiter = limiter or rate_limiter
+
+    def generate(self, prompts, fallbacks):
+        """
+        prompts and fallbacks are dicts keyed the same way (e.g. by student id),
+        returns a dict of texts with the same keys.
+        """
+        hashes = {key: prompt_hash(prompt) for key, prompt in prompts.items()}
+        answers = dict(
+            AIResponse.objects.filter(prompt_hash__in=set(hashes.values()))
+            .values_list('prompt_hash', 'response')
+        )
+
+        missing = {}
+        for key, digest in hashes.items():
+            if digest not in answers:
+                missing.setdefault(digest, prompts[key])
+
+        if missing and self.model is not None:
+            fresh = asyncio.run(self._run(missing, connection.schema_name))
+            AIResponse.objects.bulk_create(
+                [AIResponse(prompt_hash=digest, response=text) for digest, text in fresh.items()],
+                ignore_conflicts=True,
+            )
+            answers.update(fresh)
+
+        return {key: answers.get(digest, fallbacks[key]) for key, digest in hashes.items()}
+
+    async def _run(self, prompts, tenant):
+        async def ask(digest, prompt):
+            async with self.concurrency.slot(tenant):
+                await asyncio.sleep(self.limiter.delay(tenant))
+                try:
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(prompt), settings.AI_TIMEOUT,
+                    )
+                    text = response.text.strip()
+                except Exception as e:
+                    logger.warning('AI generation failed for %s: %s', tenant, e)
+                    return digest, None
+                return digest, text or None
+
+        results = await asyncio.gather(*(ask(d, p) for d, p in prompts.items()))
+        return {digest: text for digest, text in results if text}
+
+
+def report_comment_prompt(card):
+    subjects = ', '.join(f'{name} {total:.0f}%' for name, total, _ in card['subjects'])
+    return (
+        'Write a two sentence end of term report comment for a secondary school '
+        f"student. Average {card['average']:.0f}%, position {card['position']} of "
+        f"{card['class_size']}. Subject scores: {subjects}. "
+        'Be encouraging and specific, do not mention the student by name.'
+    )
+
+
+def fallback_comment(average):
+    if average >= 80:
+        return 'Excellent performance. Keep it up.'
+    if average >= 65:
+        return 'Very good work this term. Aim higher next term.'
+    if average >= 50:
+        return 'Good effort. There is room for improvement.'
+    return 'More effort is needed. Seek help with difficult subjects.'
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from .models import Score, SubjectResult, TermResult
+
+
+SUBJECT_KEYS = ['student_id', 'subject_id']
+TERM_KEYS = ['student_id']
+
+
+def record_scores(assessment, scores):
+    """
+    Upsert {student_id: score} for one assessment in bulk, then refresh
+    only the results of that assessment's subject.
+    """
+    Score.objects.bulk_create(
+        [Score(assessment=assessment, student_id=student_id, score=score)
+         for student_id, score in scores.items()],
+        update_conflicts=True,
+        unique_fields=['assessment', 'student'],
+        update_fields=['score'],
+        batch_size=1000,
+    )
+    refresh_results(
+        assessment.academic_year, assessment.term, assessment.class_name,
+        subject_ids=[assessment.subject_id],
+    )
+
+
+def score_frame(academic_year, term, class_name, subject_ids=None):
+    scores = Score.objects.filter(
+        assessment__academic_year=academic_year,
+        assessment__term=term,
+        assessment__class_name=class_name,
+    )
+    if subject_ids is not None:
+        scores = scores.filter(assessment__subject_id__in=subject_ids)
+    rows = scores.values_list(
+        'student_id', 'assessment__subject_id', 'score',
+        'assessment__max_score', 'assessment__weight',
+    )
+    return pd.DataFrame.from_records(
+        rows, columns=['student_id', 'subject_id', 'score', 'max_score', 'weight'],
+    )
+
+
+def subject_totals(scores):
+    """Weighted subject totals out of 100 and positions within each subject."""
+    if scores.empty:
+        return pd.DataFrame(columns=SUBJECT_KEYS + ['total', 'position'])
+    weighted = scores['score'].to_numpy() / scores['max_score'].to_numpy() * scores['weight'].to_numpy()
+    totals = (
+        scores[SUBJECT_KEYS].assign(total=weighted)
+        .groupby(SUBJECT_KEYS, as_index=False)['total'].sum()
+    )
+    totals['total'] = totals['total'].round(2)
+    totals['position'] = (
+        totals.groupby('subject_id')['total']
+        .rank(method='min', ascending=False).astype(int)
+    )
+    return totals
+
+
+def term_totals(subjects):
+    """Term total, average over subjects and class position per student."""
+    if subjects.empty:
+        return pd.DataFrame(columns=TERM_KEYS + ['total', 'average', 'position'])
+    terms = subjects.groupby('student_id', as_index=False)['total'].agg(
+        total='sum', average='mean',
+    )
+    terms['total'] = terms['total'].round(2)
+    terms['average'] = terms['average'].round(2)
+    terms['position'] = terms['average'].rank(method='min', ascending=False).astype(int)
+    return terms
+
+
+def _sync(queryset, frame, keys, values, defaults):
+    """
+    Make the rows of queryset match frame, writing only what changed:
+    new keys are inserted, changed values updated and missing keys deleted.
+    """
+    model = queryset.model
+    columns = ['id'] + keys + values
+    existing = pd.DataFrame.from_records(queryset.values_list(*columns), columns=columns)
+    if existing.empty:
+        existing = existing.astype({key: 'int64' for key in keys})
+    if frame.empty:
+        frame = frame.astype({key: 'int64' for key in keys})
+    merged = frame.merge(existing, on=keys, how='outer', suffixes=('', '_old'), indicator=True)
+
+    new = merged[merged['_merge'] == 'left_only']
+    gone = merged[merged['_merge'] == 'right_only']
+    both = merged[merged['_merge'] == 'both']
+    changed = np.zeros(len(both), dtype=bool)
+    for field in values:
+        changed |= ~np.isclose(
+            both[field].to_numpy(dtype=float), both[f'{field}_old'].to_numpy(dtype=float),
+        )
+    changed = both[changed]
+
+    if len(gone):
+        queryset.filter(id__in=gone['id'].astype(int).tolist()).delete()
+    if len(new):
+        model.objects.bulk_create(
+            [model(**defaults, **row) for row in new[keys + values].to_dict('records')],
+            batch_size=1000,
+        )
+    if len(changed):
+        model.objects.bulk_update(
+            [model(id=int(row.pop('id')), **row) for row in changed[['id'] + values].to_dict('records')],
+            values, batch_size=1000,
+        )
+    return len(new) + len(changed) + len(gone)
+
+
+def _lock_results(academic_year, term, class_name):
+    """Hold off other refreshes of this class and term until the transaction ends."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_advisory_xact_lock(hashtext(%s))',
+            [f'results:{academic_year}:{term}:{class_name}'],
+        )
+
+
+def refresh_results(academic_year, term, class_name, subject_ids=None):
+    """
+    Recompute cached results for a class and term.
+
+    With subject_ids only those subjects are re-read from Score, the term
+    results are then rebuilt from the cached SubjectResult rows. Concurrent
+    refreshes of the same class and term run one after the other, otherwise
+    both would insert the same new rows.
+    """
+    scope = {'academic_year': academic_year, 'term': term, 'class_name': class_name}
+
+    with transaction.atomic():
+        _lock_results(academic_year, term, class_name)
+        # read after the lock so a waiting refresh sees the scores saved before it
+        subjects = subject_totals(score_frame(academic_year, term, class_name, subject_ids))
+
+        cached = SubjectResult.objects.filter(**scope)
+        if subject_ids is not None:
+            cached = cached.filter(subject_id__in=subject_ids)
+        _sync(cached, subjects, SUBJECT_KEYS, ['total', 'position'], scope)
+
+        all_subjects = pd.DataFrame.from_records(
+            SubjectResult.objects.filter(**scope).values_list('student_id', 'subject_id', 'total'),
+            columns=['student_id', 'subject_id', 'total'],
+        )
+        _sync(
+            TermResult.objects.filter(**scope), term_totals(all_subjects),
+            TERM_KEYS, ['total', 'average', 'position'], scope,
+        )
@@ -0,0 +1,30 @@
+import re
+
+from django import forms
+from django.forms import ModelForm
+from .models import ReportCardJob, Student
+
+
+class ReportCardJobForm(ModelForm):
+    class_name = forms.ChoiceField(widget=forms.Select(attrs={'class': 'rounded-lg py-4 px-5 bg-gray-100'}))
+
+    class Meta:
+        model = ReportCardJob
+        fields = ['class_name', 'academic_year', 'term', 'with_comments']
+        widgets = {
+            'academic_year': forms.TextInput(attrs={'placeholder': 'Academic year, e.g. 2025/2026'}),
+            'term': forms.Select(attrs={'class': 'rounded-lg py-4 px-5 bg-gray-100'}),
+            'with_comments': forms.CheckboxInput(attrs={'class': '!w-auto'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        classes = Student.objects.order_by('class_name').values_list('class_name', flat=True).distinct()
+        self.fields['class_name'].choices = [(class_name, class_name) for class_name in classes]
+
+    def clean_academic_year(self):
+        academic_year = self.cleaned_data['academic_year'].strip()
+        match = re.fullmatch(r'(\d{4})/(\d{4})', academic_year)
+        if not match or int(match[2]) != int(match[1]) + 1:
+            raise forms.ValidationError('Enter the academic year as e.g. 2025/2026')
+        return academic_year
@@ -0,0 +1,43 @@
+"""
+Django command to generate a class' report cards as a ZIP of PDFs
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django_tenants.utils import schema_context
+
+from gradebook.models import ReportCardJob
+from gradebook.reportcards import run_job
+
+
+class Command(BaseCommand):
+    """Django command to render report cards in a process pool"""
+
+    help = 'Render report cards for a class and term into the tenant storage.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', required=True, help='Tenant schema name.')
+        parser.add_argument('--class', dest='class_name', required=True)
+        parser.add_argument('--year', dest='academic_year', required=True, help='e.g. 2025/2026')
+        parser.add_argument('--term', type=int, required=True, choices=[1, 2, 3])
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Render processes, defaults to the CPU count.')
+        parser.add_argument('--comments', action='store_true',
+                            help='Generate missing comments with the AI service first.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with schema_context(options['schema']):
+            job = ReportCardJob.objects.create(
+                class_name=options['class_name'],
+                academic_year=options['academic_year'],
+                term=options['term'],
+                with_comments=options['comments'],
+            )
+            try:
+                job = run_job(job.pk, workers=options['workers'])
+            except Exception as e:
+                raise CommandError(f'Report cards failed: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {job.total} report cards to {job.archive.name}'
+        ))
@@ -0,0 +1,203 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+TERMS = [(1, "Term 1"), (2, "Term 2"), (3, "Term 3")]
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Subject",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("code", models.CharField(max_length=20, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Student",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("first_name", models.CharField(max_length=50)),
+                ("last_name", models.CharField(max_length=50)),
+                ("index_number", models.CharField(max_length=20, unique=True)),
+                ("class_name", models.CharField(db_index=True, max_length=50)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Assessment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("class_name", models.CharField(max_length=50)),
+                ("academic_year", models.CharField(max_length=9)),
+                ("term", models.PositiveSmallIntegerField(choices=TERMS)),
+                ("name", models.CharField(max_length=100)),
+                ("max_score", models.FloatField(default=100)),
+                ("weight", models.FloatField(default=100)),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gradebook.subject",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["academic_year", "term", "class_name"],
+                        name="assessment_term_class_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="Score",
+            fields=[
+                (
+                    "pk",
+                    models.CompositePrimaryKey(
+                        "assessment_id",
+                        "student_id",
+                        blank=True,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "assessment",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gradebook.assessment",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gradebook.student",
+                    ),
+                ),
+                ("score", models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SubjectResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("class_name", models.CharField(max_length=50)),
+                ("academic_year", models.CharField(max_length=9)),
+                ("term", models.PositiveSmallIntegerField(choices=TERMS)),
+                ("total", models.FloatField()),
+                ("position", models.PositiveIntegerField()),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gradebook.student",
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gradebook.subject",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("academic_year", "term", "class_name", "subject", "student"),
+                        name="unique_subject_result",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="TermResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("class_name", models.CharField(max_length=50)),
+                ("academic_year", models.CharField(max_length=9)),
+                ("term", models.PositiveSmallIntegerField(choices=TERMS)),
+                ("total", models.FloatField()),
+                ("average", models.FloatField()),
+                ("position", models.PositiveIntegerField()),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gradebook.student",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("academic_year", "term", "class_name", "student"),
+                        name="unique_term_result",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,130 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+TERMS = [(1, 'Term 1'), (2, 'Term 2'), (3, 'Term 3')]
+
+
+class Subject(models.Model):
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=20, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Student(models.Model):
+    user = models.OneToOneField(User, on_delete=models.SET_NULL, null=True, blank=True)
+    first_name = models.CharField(max_length=50)
+    last_name = models.CharField(max_length=50)
+    index_number = models.CharField(max_length=20, unique=True)
+    class_name = models.CharField(max_length=50, db_index=True)
+
+    def __str__(self):
+        return f'{self.first_name} {self.last_name}'
+
+
+class Assessment(models.Model):
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    class_name = models.CharField(max_length=50)
+    academic_year = models.CharField(max_length=9)  # e.g. 2025/2026
+    term = models.PositiveSmallIntegerField(choices=TERMS)
+    name = models.CharField(max_length=100)
+    max_score = models.FloatField(default=100)
+    # share of the subject's term total, in percent
+    weight = models.FloatField(default=100)
+
+    class Meta:
+        indexes = [models.Index(fields=['academic_year', 'term', 'class_name'], name='assessment_term_class_idx')]
+
+    def __str__(self):
+        return f'{self.subject} - {self.name}'
+
+
+class Score(models.Model):
+    # no surrogate id, the (assessment, student) key is the only index needed for upserts
+    pk = models.CompositePrimaryKey('assessment_id', 'student_id')
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, db_index=False)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    score = models.FloatField()
+
+
+class SubjectResult(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    class_name = models.CharField(max_length=50)
+    academic_year = models.CharField(max_length=9)
+    term = models.PositiveSmallIntegerField(choices=TERMS)
+    total = models.FloatField()
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['academic_year', 'term', 'class_name', 'subject', 'student'],
+                name='unique_subject_result',
+            ),
+        ]
+
+
+class TermResult(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    class_name = models.CharField(max_length=50)
+    academic_year = models.CharField(max_length=9)
+    term = models.PositiveSmallIntegerField(choices=TERMS)
+    total = models.FloatField()
+    average = models.FloatField()
+    position = models.PositiveIntegerField()
+    comment = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['academic_year', 'term', 'class_name', 'student'],
+                name='unique_term_result',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.student} {self.academic_year} T{self.term}'
+
+
+class ReportCardJob(models.Model):
+    STATUS = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    class_name = models.CharField(max_length=50)
+    academic_year = models.CharField(max_length=9)
+    term = models.PositiveSmallIntegerField(choices=TERMS)
+    with_comments = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    archive = models.FileField(upload_to='report_cards/', null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.class_name} {self.academic_year} T{self.term}'
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 0
+        return int(self.done * 100 / self.total)
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+
+class AIResponse(models.Model):
+    # sha256 of model name + prompt, identical prompts are only sent once
+    prompt_hash = models.CharField(max_length=64, primary_key=True)
+    response = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,109 @@
+"""
+Report card rendering for worker processes.
+
+Only Pillow is imported here so spawned workers start without setting up
+Django. Branding is loaded once per worker by init_worker.
+"""
+
+import io
+import textwrap
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+PAGE_SIZE = (827, 1169)  # A4 at 100 dpi
+MARGIN = 60
+
+_branding = {}
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow built without FreeType
+        return ImageFont.load_default()
+
+
+def init_worker(school_name, color, logo_bytes):
+    """Process pool initializer, decodes the logo and fonts once per worker."""
+    rgb = ImageColor.getrgb(color or '#1F2937')
+    luminance = 0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2]
+
+    logo = None
+    if logo_bytes:
+        logo = Image.open(io.BytesIO(logo_bytes)).convert('RGBA')
+        logo.thumbnail((90, 90))
+
+    _branding.update({
+        'name': school_name,
+        'color': rgb,
+        'text_color': (0, 0, 0) if luminance > 150 else (255, 255, 255),
+        'logo': logo,
+        'title': _font(30),
+        'heading': _font(20),
+        'body': _font(16),
+    })
+
+
+def render_report_card(card):
+    """Render one student's card, returns (filename, pdf bytes)."""
+    width, height = PAGE_SIZE
+    page = Image.new('RGB', PAGE_SIZE, 'white')
+    draw = ImageDraw.Draw(page)
+    body = _branding['body']
+
+    # header band with logo and school name
+    draw.rectangle([0, 0, width, 130], fill=_branding['color'])
+    x = MARGIN
+    if _branding['logo']:
+        page.paste(_branding['logo'], (MARGIN, 20), _branding['logo'])
+        x += 110
+    draw.text((x, 30), _branding['name'], font=_branding['title'], fill=_branding['text_color'])
+    draw.text(
+        (x, 75), f"Report Card - {card['academic_year']} Term {card['term']}",
+        font=_branding['heading'], fill=_branding['text_color'],
+    )
+
+    y = 160
+    for label, value in [
+        ('Name', card['name']),
+        ('Index number', card['index_number']),
+        ('Class', card['class_name']),
+    ]:
+        draw.text((MARGIN, y), f'{label}: {value}', font=body, fill='black')
+        y += 26
+
+    # subject table
+    y += 20
+    columns = [MARGIN, 460, 600]
+    draw.rectangle([MARGIN - 10, y - 6, width - MARGIN + 10, y + 26], fill=(243, 244, 246))
+    for column, heading in zip(columns, ['Subject', 'Score', 'Position']):
+        draw.text((column, y), heading, font=_branding['heading'], fill='black')
+    y += 40
+    for subject, total, position in card['subjects']:
+        draw.text((columns[0], y), subject, font=body, fill='black')
+        draw.text((columns[1], y), f'{total:.1f}', font=body, fill='black')
+        draw.text((columns[2], y), str(position), font=body, fill='black')
+        y += 28
+        draw.line([MARGIN - 10, y - 6, width - MARGIN + 10, y - 6], fill=(229, 231, 235))
+
+    y += 20
+    draw.text((MARGIN, y), f"Total: {card['total']:.1f}", font=body, fill='black')
+    draw.text((columns[1], y), f"Average: {card['average']:.1f}", font=body, fill='black')
+    y += 28
+    draw.text(
+        (MARGIN, y), f"Position: {card['position']} of {card['class_size']}",
+        font=body, fill='black',
+    )
+
+    if card.get('comment'):
+        y += 50
+        draw.text((MARGIN, y), 'Comment', font=_branding['heading'], fill='black')
+        y += 32
+        for line in textwrap.wrap(card['comment'], width=80):
+            draw.text((MARGIN, y), line, font=body, fill='black')
+            y += 24
+
+    out = io.BytesIO()
+    page.save(out, 'PDF', resolution=100)
+    return card['filename'], out.getvalue()
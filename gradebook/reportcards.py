@@ -0,0 +1,174 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection
+from django.utils import timezone
+from django.utils.text import slugify
+from django_tenants.utils import schema_context
+from home.models import SchoolSettings
+from school_manager.models import School
+from school_manager.routers import pin_to_primary
+from .ai import CommentGenerator, fallback_comment, report_comment_prompt
+from .models import ReportCardJob, SubjectResult, TermResult
+from .rendering import init_worker, render_report_card
+
+logger = logging.getLogger(__name__)
+
+# progress is written to the job row at most this often
+PROGRESS_EVERY = 25
+
+
+def build_cards(class_name, academic_year, term):
+    """Plain dicts for every student in the class, read with two queries."""
+    scope = {'academic_year': academic_year, 'term': term, 'class_name': class_name}
+    subjects = defaultdict(list)
+    for student_id, name, total, position in (
+        SubjectResult.objects.filter(**scope)
+        .order_by('subject__name')
+        .values_list('student_id', 'subject__name', 'total', 'position')
+    ):
+        subjects[student_id].append((name, total, position))
+
+    results = list(TermResult.objects.filter(**scope).select_related('student').order_by('position'))
+    cards = []
+    for result in results:
+        student = result.student
+        cards.append({
+            'result_id': result.id,
+            'filename': f'{student.index_number}-{slugify(str(student))}.pdf',
+            'name': str(student),
+            'index_number': student.index_number,
+            'class_name': class_name,
+            'academic_year': academic_year,
+            'term': term,
+            'subjects': subjects[student.id],
+            'total': result.total,
+            'average': result.average,
+            'position': result.position,
+            'class_size': len(results),
+            'comment': result.comment,
+        })
+    return cards
+
+
+def add_comments(cards):
+    """Fill in missing comments for the whole class in one batch."""
+    todo = [card for card in cards if not card['comment']]
+    if not todo:
+        return
+    comments = CommentGenerator().generate(
+        {card['result_id']: report_comment_prompt(card) for card in todo},
+        {card['result_id']: fallback_comment(card['average']) for card in todo},
+    )
+    for card in todo:
+        card['comment'] = comments[card['result_id']]
+    TermResult.objects.bulk_update(
+        [TermResult(id=card['result_id'], comment=card['comment']) for card in todo],
+        ['comment'], batch_size=500,
+    )
+
+
+def branding():
+    """Initializer arguments for the worker processes."""
+    settings = SchoolSettings.objects.first()
+    if settings and settings.name:
+        name = settings.name
+    else:
+        name = School.objects.filter(schema_name=connection.schema_name).values_list('name', flat=True).first() or ''
+    if not settings:
+        return name, None, None
+    logo = None
+    if settings.logo:
+        with settings.logo.open('rb') as f:
+            logo = f.read()
+    return name, settings.color, logo
+
+
+def generate(job, workers=None, progress=None):
+    """
+    Render every card of the job's class in a process pool and stream the
+    PDFs into a single ZIP saved through the tenant storage.
+    """
+    cards = build_cards(job.class_name, job.academic_year, job.term)
+    if job.with_comments:
+        add_comments(cards)
+    job.total = len(cards)
+    ReportCardJob.objects.filter(pk=job.pk).update(total=job.total)
+
+    # spawn, so workers never inherit this process' threads and DB connections
+    context = multiprocessing.get_context('spawn')
+    workers = workers or os.cpu_count()
+    with tempfile.TemporaryFile() as archive:
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as zf, ProcessPoolExecutor(
+            max_workers=workers, mp_context=context,
+            initializer=init_worker, initargs=branding(),
+        ) as pool:
+            # rendered pages are already compressed, storing them is enough
+            for done, (filename, pdf) in enumerate(
+                pool.map(render_report_card, cards, chunksize=8), 1
+            ):
+                zf.writestr(filename, pdf)
+                if progress and (done % PROGRESS_EVERY == 0 or done == len(cards)):
+                    progress(done)
+
+        archive.seek(0)
+        # media files are public, the random directory keeps the archive's URL unguessable
+        name = f'{job.pk}-{uuid.uuid4().hex}/{slugify(job.class_name)}-{job.academic_year.replace("/", "-")}-term{job.term}.zip'
+        job.archive.save(name, File(archive), save=False)
+
+    job.status = 'done'
+    job.done = job.total
+    job.save(update_fields=['archive', 'status', 'done'])
+    return job
+
+
+def run_job(job_id, workers=None):
+    def progress(done):
+        ReportCardJob.objects.filter(pk=job_id).update(done=done)
+
+    try:
+        job = ReportCardJob.objects.get(pk=job_id)
+        job.status = 'running'
+        job.save(update_fields=['status'])
+        return generate(job, workers, progress)
+    except Exception as e:
+        ReportCardJob.objects.filter(pk=job_id).update(status='failed', error=str(e))
+        raise
+
+
+def start_job(job):
+    """Run the job in a background thread under the current tenant."""
+    schema_name = connection.schema_name
+
+    def target():
+        # a new thread starts with an empty context, the job row was only just written
+        pin_to_primary()
+        try:
+            with schema_context(schema_name):
+                run_job(job.pk)
+        except Exception:
+            logger.exception('Report card job %s failed', job.pk)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=target, name=f'report-cards-{job.pk}', daemon=True)
+    thread.start()
+    return thread
+
+
+def expire_stale_jobs():
+    """Fail jobs whose thread died, e.g. in a worker restart, so pages stop polling them."""
+    cutoff = timezone.now() - timedelta(seconds=settings.REPORT_CARD_JOB_TIMEOUT)
+    return ReportCardJob.objects.filter(
+        status__in=['pending', 'running'], created_at__lt=cutoff,
+    ).update(status='failed', error='Timed out, please try again.')
@@ -0,0 +1,406 @@
+import asyncio
+import datetime
+import io
+import tempfile
+import threading
+import zipfile
+from unittest import mock
+
+import pandas as pd
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.test.client import TenantClient
+from django_tenants.utils import schema_context
+from PIL import Image
+from school_manager.models import School
+from school_manager.routers import is_pinned
+from .ai import CommentGenerator, ConcurrencyLimiter, RateLimiter, prompt_hash
+from .engine import _lock_results, _sync, record_scores, refresh_results, score_frame, subject_totals, term_totals
+from .models import AIResponse, Assessment, ReportCardJob, Score, Student, Subject, SubjectResult, TermResult
+from .rendering import init_worker, render_report_card
+from .reportcards import expire_stale_jobs, generate, run_job, start_job
+
+
+def scores(*rows):
+    return pd.DataFrame.from_records(
+        rows, columns=['student_id', 'subject_id', 'score', 'max_score', 'weight'],
+    )
+
+
+class TotalsTests(SimpleTestCase):
+
+    def test_weighted_subject_totals(self):
+        totals = subject_totals(scores(
+            # exam out of 100 worth 70%, classwork out of 20 worth 30%
+            (1, 10, 80, 100, 70), (1, 10, 15, 20, 30),
+            (2, 10, 70, 100, 70), (2, 10, 20, 20, 30),
+        )).set_index('student_id')
+        self.assertEqual(totals.loc[1, 'total'], 78.5)
+        self.assertEqual(totals.loc[2, 'total'], 79.0)
+        self.assertEqual(totals['position'].to_dict(), {1: 2, 2: 1})
+
+    def test_positions_are_ranked_per_subject(self):
+        totals = subject_totals(scores(
+            (1, 10, 90, 100, 100), (2, 10, 60, 100, 100),
+            (1, 11, 40, 100, 100), (2, 11, 50, 100, 100),
+        )).set_index(['student_id', 'subject_id'])
+        self.assertEqual(totals['position'].to_dict(), {(1, 10): 1, (2, 10): 2, (1, 11): 2, (2, 11): 1})
+
+    def test_tied_subject_positions_share_the_best_place(self):
+        totals = subject_totals(scores(
+            (1, 10, 90, 100, 100), (2, 10, 90, 100, 100), (3, 10, 80, 100, 100),
+        )).set_index('student_id')
+        self.assertEqual(totals['position'].to_dict(), {1: 1, 2: 1, 3: 3})
+
+    def test_term_totals_and_tied_positions(self):
+        subjects = pd.DataFrame.from_records(
+            [(1, 10, 80), (1, 11, 60), (2, 10, 70), (2, 11, 70), (3, 10, 50), (3, 11, 50)],
+            columns=['student_id', 'subject_id', 'total'],
+        )
+        terms = term_totals(subjects).set_index('student_id')
+        self.assertEqual(terms['total'].to_dict(), {1: 140, 2: 140, 3: 100})
+        self.assertEqual(terms['average'].to_dict(), {1: 70, 2: 70, 3: 50})
+        self.assertEqual(terms['position'].to_dict(), {1: 1, 2: 1, 3: 3})
+
+    def test_no_scores(self):
+        self.assertTrue(subject_totals(scores()).empty)
+        self.assertTrue(term_totals(subject_totals(scores())).empty)
+
+
+class RecordScoresTests(TenantTestCase):
+
+    scope = {'academic_year': '2025/2026', 'term': 1, 'class_name': 'Form 1A'}
+
+    def setUp(self):
+        self.students = [
+            Student.objects.create(first_name=name, last_name='Mensah', index_number=str(i), class_name='Form 1A')
+            for i, name in enumerate(['Ama', 'Kofi', 'Yaw'])
+        ]
+        self.maths = Assessment.objects.create(
+            subject=Subject.objects.create(name='Mathematics', code='MATH'), name='Exam', **self.scope,
+        )
+        self.english = Assessment.objects.create(
+            subject=Subject.objects.create(name='English', code='ENG'), name='Exam', **self.scope,
+        )
+        ama, kofi, yaw = self.students
+        record_scores(self.maths, {ama.pk: 90, kofi.pk: 70, yaw.pk: 50})
+        record_scores(self.english, {ama.pk: 60, kofi.pk: 80, yaw.pk: 40})
+
+    def results(self, subject=None):
+        rows = SubjectResult.objects.filter(subject=subject) if subject else TermResult.objects.all()
+        return {row.student_id: row for row in rows}
+
+    def test_results_are_cached(self):
+        ama, kofi, yaw = self.students
+        maths = self.results(self.maths.subject)
+        self.assertEqual({pk: row.position for pk, row in maths.items()}, {ama.pk: 1, kofi.pk: 2, yaw.pk: 3})
+        terms = self.results()
+        self.assertEqual(terms[ama.pk].total, 150)
+        self.assertEqual(terms[kofi.pk].average, 75)
+        self.assertEqual({pk: row.position for pk, row in terms.items()}, {ama.pk: 1, kofi.pk: 1, yaw.pk: 3})
+
+    def test_update_only_touches_that_subject(self):
+        ama, kofi, yaw = self.students
+        english = self.results(self.english.subject)
+        maths = self.results(self.maths.subject)
+
+        with mock.patch('gradebook.engine.score_frame', wraps=score_frame) as frame:
+            record_scores(self.maths, {yaw.pk: 95})
+        # only the changed subject is re-read from Score
+        frame.assert_called_once_with('2025/2026', 1, 'Form 1A', [self.maths.subject_id])
+
+        # other subjects' rows are left as they were
+        for pk, row in self.results(self.english.subject).items():
+            self.assertEqual((row.id, row.total, row.position), (english[pk].id, english[pk].total, english[pk].position))
+
+        # changed rows are updated in place, not replaced
+        updated = self.results(self.maths.subject)
+        self.assertEqual({pk: row.id for pk, row in updated.items()}, {pk: row.id for pk, row in maths.items()})
+        self.assertEqual({pk: row.position for pk, row in updated.items()}, {ama.pk: 2, kofi.pk: 3, yaw.pk: 1})
+        self.assertEqual(self.results()[yaw.pk].total, 135)
+
+    def test_unchanged_results_are_not_written(self):
+        written = []
+
+        def sync(*args):
+            written.append(_sync(*args))
+            return written[-1]
+
+        with mock.patch('gradebook.engine._sync', side_effect=sync):
+            record_scores(self.maths, {self.students[0].pk: 90})
+        # subject and term results, nothing inserted, updated or deleted
+        self.assertEqual(written, [0, 0])
+
+    def test_removed_students_are_deleted(self):
+        yaw = self.students[2]
+        Score.objects.filter(student=yaw).delete()
+        refresh_results(**self.scope)
+        self.assertNotIn(yaw.pk, self.results(self.maths.subject))
+        self.assertNotIn(yaw.pk, self.results())
+        self.assertEqual(SubjectResult.objects.count(), 4)
+
+
+# the refreshes run in threads, which would read from the replica
+@override_settings(DATABASE_REPLICAS=[])
+class ConcurrentRefreshTests(TransactionTestCase):
+
+    scope = {'academic_year': '2025/2026', 'term': 1, 'class_name': 'Form 1A'}
+
+    def setUp(self):
+        school = School(schema_name='marks', name='Marks College')
+        school.save(verbosity=0)
+        self.addCleanup(school.delete, force_drop=True)
+        with schema_context('marks'):
+            student = Student.objects.create(first_name='Ama', last_name='Mensah', index_number='0100', class_name='Form 1A')
+            assessment = Assessment.objects.create(
+                subject=Subject.objects.create(name='Mathematics', code='MATH'), name='Exam', **self.scope,
+            )
+            Score.objects.create(assessment=assessment, student=student, score=80)
+
+    def in_thread(self, target):
+        def run():
+            try:
+                with schema_context('marks'):
+                    target()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_refresh_waits_for_other_refresh_of_the_class(self):
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with transaction.atomic():
+                _lock_results(**self.scope)
+                locked.set()
+                release.wait(5)
+
+        holder = self.in_thread(hold_lock)
+        locked.wait(5)
+        refresh = self.in_thread(lambda: refresh_results(**self.scope))
+        refresh.join(0.5)
+        self.assertTrue(refresh.is_alive())
+
+        release.set()
+        holder.join()
+        refresh.join()
+        with schema_context('marks'):
+            self.assertEqual(TermResult.objects.count(), 1)
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel, no network."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = fail_on
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # batches may run in several threads
+        self.lock = threading.Lock()
+
+    async def generate_content_async(self, prompt):
+        with self.lock:
+            self.calls.append(prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        if prompt in self.fail_on:
+            raise RuntimeError('model unavailable')
+        return StubResponse(f'comment for {prompt}')
+
+
+class CommentGeneratorTests(SimpleTestCase):
+
+    def run_prompts(self, generator, prompts):
+        return asyncio.run(generator._run({prompt_hash(p): p for p in prompts}, 'amass'))
+
+    def test_concurrency_is_limited(self):
+        model = StubModel()
+        generator = CommentGenerator(model=model, concurrency=ConcurrencyLimiter(3), limiter=RateLimiter(0))
+        results = self.run_prompts(generator, [f'prompt {i}' for i in range(12)])
+        self.assertEqual(len(results), 12)
+        self.assertLessEqual(model.max_in_flight, 3)
+
+    def test_concurrency_is_limited_across_batches(self):
+        model = StubModel()
+        generator = CommentGenerator(model=model, concurrency=ConcurrencyLimiter(3), limiter=RateLimiter(0))
+        threads = [
+            threading.Thread(target=self.run_prompts, args=(generator, [f'batch {n} prompt {i}' for i in range(6)]))
+            for n in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(model.calls), 12)
+        self.assertLessEqual(model.max_in_flight, 3)
+
+    def test_failures_are_left_for_fallback(self):
+        model = StubModel(fail_on=['bad'])
+        generator = CommentGenerator(model=model, concurrency=ConcurrencyLimiter(2), limiter=RateLimiter(0))
+        results = self.run_prompts(generator, ['good', 'bad'])
+        self.assertEqual(results, {prompt_hash('good'): 'comment for good'})
+
+    def test_rate_limiter_spaces_requests_per_tenant(self):
+        limiter = RateLimiter(60)
+        self.assertEqual(limiter.delay('amass'), 0)
+        self.assertAlmostEqual(limiter.delay('amass'), 1, places=1)
+        self.assertEqual(limiter.delay('other'), 0)
+
+
+class GenerateCommentsTests(TenantTestCase):
+
+    def generator(self, model):
+        return CommentGenerator(model=model, concurrency=ConcurrencyLimiter(2), limiter=RateLimiter(0))
+
+    def test_identical_prompts_are_sent_once(self):
+        model = StubModel()
+        comments = self.generator(model).generate({1: 'good', 2: 'good'}, {1: 'ok', 2: 'ok'})
+        self.assertEqual(comments, {1: 'comment for good', 2: 'comment for good'})
+        self.assertEqual(model.calls, ['good'])
+
+    def test_answers_are_cached(self):
+        self.generator(StubModel()).generate({1: 'good'}, {1: 'ok'})
+        model = StubModel()
+        comments = self.generator(model).generate({2: 'good'}, {2: 'ok'})
+        self.assertEqual(comments, {2: 'comment for good'})
+        self.assertEqual(model.calls, [])
+
+    def test_failed_prompts_get_fallback_and_are_not_cached(self):
+        model = StubModel(fail_on=['bad'])
+        comments = self.generator(model).generate({1: 'good', 2: 'bad'}, {1: 'ok', 2: 'fallback'})
+        self.assertEqual(comments, {1: 'comment for good', 2: 'fallback'})
+        self.assertFalse(AIResponse.objects.filter(prompt_hash=prompt_hash('bad')).exists())
+
+    def test_no_model_uses_fallbacks(self):
+        with mock.patch('gradebook.ai.get_model', return_value=None):
+            comments = CommentGenerator().generate({1: 'good'}, {1: 'ok'})
+        self.assertEqual(comments, {1: 'ok'})
+        self.assertFalse(AIResponse.objects.exists())
+
+
+class RenderReportCardTests(SimpleTestCase):
+
+    def test_renders_pdf_with_branding(self):
+        logo = io.BytesIO()
+        Image.new('RGB', (200, 200), 'red').save(logo, 'PNG')
+        init_worker('Daboya College', '#1D4ED8', logo.getvalue())
+
+        filename, pdf = render_report_card({
+            'filename': '0100-ama-mensah.pdf',
+            'name': 'Ama Mensah',
+            'index_number': '0100',
+            'class_name': 'Form 1A',
+            'academic_year': '2025/2026',
+            'term': 1,
+            'subjects': [('English', 72.5, 3), ('Mathematics', 88.0, 1)],
+            'total': 160.5,
+            'average': 80.25,
+            'position': 2,
+            'class_size': 40,
+            'comment': 'Excellent performance. Keep it up.',
+        })
+        self.assertEqual(filename, '0100-ama-mensah.pdf')
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+
+class ReportCardsViewTests(TenantTestCase):
+
+    def setUp(self):
+        self.client = TenantClient(self.tenant)
+        self.client.force_login(User.objects.create_user('head', is_staff=True))
+        Student.objects.create(first_name='Ama', last_name='Mensah', index_number='0100', class_name='Form 1A')
+        self.url = reverse('report-cards')
+
+    def post(self, **data):
+        params = {'class_name': 'Form 1A', 'academic_year': '2025/2026', 'term': '1', **data}
+        with mock.patch('gradebook.views.start_job') as start_job:
+            response = self.client.post(self.url, params, headers={'HX-Request': 'true'})
+        return response, start_job
+
+    def test_form_lists_classes(self):
+        self.assertContains(self.client.get(self.url), '<option value="Form 1A">')
+
+    def test_starts_job(self):
+        response, start_job = self.post(with_comments='1')
+        job = ReportCardJob.objects.get()
+        start_job.assert_called_once_with(job)
+        self.assertEqual((job.class_name, job.term, job.with_comments), ('Form 1A', 1, True))
+
+    def test_invalid_input_returns_form(self):
+        for data in ({'term': 'x'}, {'term': '9'}, {'class_name': 'Form 9Z'}, {'academic_year': 'soon'}):
+            with self.subTest(**data):
+                response, start_job = self.post(**data)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['HX-Retarget'], '#report-card-form')
+                self.assertContains(response, 'errorlist')
+                start_job.assert_not_called()
+        self.assertFalse(ReportCardJob.objects.exists())
+
+
+class GenerateTests(TenantTestCase):
+
+    def setUp(self):
+        student = Student.objects.create(first_name='Ama', last_name='Mensah', index_number='0100', class_name='Form 1A')
+        TermResult.objects.create(
+            student=student, class_name='Form 1A', academic_year='2025/2026', term=1,
+            total=160.5, average=80.25, position=1, comment='Well done.',
+        )
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def test_archive_name_is_unguessable(self):
+        job = ReportCardJob.objects.create(class_name='Form 1A', academic_year='2025/2026', term=1)
+        job = generate(job, workers=1)
+
+        self.assertEqual(job.status, 'done')
+        directory, filename = job.archive.name.split('/')[-2:]
+        self.assertEqual(filename, 'form-1a-2025-2026-term1.zip')
+        self.assertRegex(directory, rf'^{job.pk}-[0-9a-f]{{32}}$')
+        with job.archive.open() as f:
+            self.assertEqual(zipfile.ZipFile(f).namelist(), ['0100-ama-mensah.pdf'])
+
+
+class ReportCardJobTests(TenantTestCase):
+
+    def setUp(self):
+        self.job = ReportCardJob.objects.create(class_name='Form 1A', academic_year='2025/2026', term=1)
+
+    def test_job_thread_reads_from_primary(self):
+        pinned = []
+        with mock.patch('gradebook.reportcards.run_job', lambda pk: pinned.append(is_pinned())):
+            start_job(self.job).join()
+        self.assertEqual(pinned, [True])
+
+    def test_job_that_cannot_be_read_is_failed(self):
+        with mock.patch.object(ReportCardJob.objects, 'get', side_effect=ReportCardJob.DoesNotExist), \
+                self.assertRaises(ReportCardJob.DoesNotExist):
+            run_job(self.job.pk)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'failed')
+
+    def test_stale_jobs_are_failed(self):
+        recent = ReportCardJob.objects.create(class_name='Form 1B', academic_year='2025/2026', term=1, status='running')
+        ReportCardJob.objects.filter(pk=self.job.pk).update(
+            status='running', created_at=timezone.now() - datetime.timedelta(hours=1),
+        )
+        self.assertEqual(expire_stale_jobs(), 1)
+        self.job.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual((self.job.status, recent.status), ('failed', 'running'))
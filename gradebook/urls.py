@@ -0,0 +1,7 @@
+from django.urls import path
+from gradebook.views import *
+
+urlpatterns = [
+    path('report-cards/', report_cards_view, name="report-cards"),
+    path('report-cards/<int:pk>/', report_card_job_view, name="report-card-job"),
+]
@@ -0,0 +1,34 @@
+from django.shortcuts import render, get_object_or_404
+from django.contrib.admin.views.decorators import staff_member_required
+from django_htmx.http import reswap, retarget
+from .forms import ReportCardJobForm
+from .models import *
+from .reportcards import expire_stale_jobs, start_job
+
+
+@staff_member_required
+def report_cards_view(request):
+    form = ReportCardJobForm()
+
+    if request.method == 'POST':
+        form = ReportCardJobForm(request.POST)
+        if not form.is_valid():
+            # show the errors in place of the form instead of adding a job
+            response = render(request, 'partials/report_card_form.html', {'form':form})
+            return reswap(retarget(response, '#report-card-form'), 'outerHTML')
+        job = form.save(commit=False)
+        job.created_by = request.user
+        job.save()
+        start_job(job)
+        return render(request, 'partials/report_card_progress.html', {'job':job})
+
+    expire_stale_jobs()
+    jobs = ReportCardJob.objects.order_by('-created_at')[:10]
+    return render(request, 'gradebook/report_cards.html', {'form':form, 'jobs':jobs})
+
+
+@staff_member_required
+def report_card_job_view(request, pk):
+    expire_stale_jobs()
+    job = get_object_or_404(ReportCardJob, pk=pk)
+    return render(request, 'partials/report_card_progress.html', {'job':job})
@@ -1,6 +1,42 @@
+from django import forms
 from django.contrib import admin
+from django.core.files.uploadedfile import UploadedFile
 from .models import *
+from .uploads import ChunkedUploadMixin, check_image_header
+
+
+class SchoolSettingsForm(ChunkedUploadMixin, forms.ModelForm):
+    logo_upload = forms.UUIDField(required=False, widget=forms.HiddenInput)
+    chunked_uploads = {'logo': 'logo'}
+    # set by SchoolSettingsAdmin.get_form
+    upload_user = None
+
+    class Meta:
+        model = SchoolSettings
+        fields = '__all__'
+
+    def clean_logo(self):
+        logo = self.cleaned_data.get('logo')
+        if isinstance(logo, UploadedFile):
+            check_image_header(logo)
+        return logo
+
+    def get_upload_user(self):
+        return self.upload_user
+
+
+class SchoolSettingsAdmin(admin.ModelAdmin):
+    form = SchoolSettingsForm
+
+    class Media:
+        js = ['js/chunked-upload.js']
+
+    def get_form(self, request, obj=None, **kwargs):
+        # a new form class per request, the uploads must be this user's
+        form = super().get_form(request, obj, **kwargs)
+        form.upload_user = request.user
+        return form
 
 
 admin.site.register(Item)
-admin.site.register(SchoolSettings)
\ No newline at end of file
+admin.site.register(SchoolSettings, SchoolSettingsAdmin)
\ No newline at end of file
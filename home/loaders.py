@@ -0,0 +1,108 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connection
+from django.template import Origin, Template, engines
+from django.template.loaders import cached, filesystem
+from django.utils._os import safe_join
+from django_tenants.utils import get_public_schema_name
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class Loader(cached.Loader):
+    """
+    Cached template loader with per-school overrides.
+
+    A template found in TENANT_TEMPLATES_DIR/<schema_name>/ replaces the
+    regular one for that tenant, e.g. tenant_templates/amass/includes/header.html.
+    Overrides and misses are compiled or recorded once per process; their
+    files are re-checked at most every TENANT_TEMPLATES_CHECK_INTERVAL seconds
+    and only the entries whose file changed are dropped.
+    """
+
+    def __init__(self, engine, loaders):
+        super().__init__(engine, loaders)
+        self.override_root = str(settings.TENANT_TEMPLATES_DIR)
+        self.override_loader = filesystem.Loader(engine, dirs=[])
+        # schema_name -> {template_name: (template or None, mtime, path)}
+        self.overrides = {}
+        self.checked = {}
+
+    def get_dirs(self):
+        yield from super().get_dirs()
+        yield self.override_root
+
+    def get_template(self, template_name, skip=None):
+        schema_name = connection.schema_name
+        if schema_name != get_public_schema_name():
+            template = self.get_override(schema_name, template_name, skip)
+            if template is not None:
+                return template
+        return super().get_template(template_name, skip)
+
+    def get_override(self, schema_name, template_name, skip=None):
+        self.revalidate(schema_name)
+        entries = self.overrides.setdefault(schema_name, {})
+        entry = entries.get(template_name)
+        if entry is None:
+            entry = entries[template_name] = self.load_override(schema_name, template_name)
+
+        template, mtime, path = entry
+        if template is not None and skip and any(origin.name == path for origin in skip):
+            # the override extends the template it replaces
+            return None
+        return template
+
+    def load_override(self, schema_name, template_name):
+        try:
+            path = safe_join(self.override_root, schema_name, template_name)
+        except SuspiciousFileOperation:
+            return None, None, None
+
+        mtime = _mtime(path)
+        if mtime is None:
+            return None, None, path
+
+        origin = Origin(name=path, template_name=template_name, loader=self.override_loader)
+        contents = self.override_loader.get_contents(origin)
+        return Template(contents, origin, template_name, self.engine), mtime, path
+
+    def revalidate(self, schema_name):
+        now = time.monotonic()
+        if now - self.checked.get(schema_name, 0) < settings.TENANT_TEMPLATES_CHECK_INTERVAL:
+            return
+        self.checked[schema_name] = now
+        entries = self.overrides.get(schema_name, {})
+        for template_name, (template, mtime, path) in list(entries.items()):
+            if path and _mtime(path) != mtime:
+                entries.pop(template_name, None)
+
+    def invalidate(self, schema_name, template_name=None):
+        if template_name is None:
+            self.overrides.pop(schema_name, None)
+        else:
+            self.overrides.get(schema_name, {}).pop(template_name, None)
+
+    def reset(self):
+        super().reset()
+        self.overrides.clear()
+        self.checked.clear()
+
+
+def invalidate_override(schema_name, template_name=None):
+    """Drop cached overrides of one school in this process, e.g. after writing one."""
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for loader in engine.template_loaders:
+            if isinstance(loader, Loader):
+                loader.invalidate(schema_name, template_name)
@@ -0,0 +1,32 @@
+"""
+Django command to delete chunked uploads that were never attached
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django_tenants.utils import get_public_schema_name, schema_context
+
+from home.models import UploadSession
+from home.uploads import discard_upload
+from school_manager.models import School
+
+
+class Command(BaseCommand):
+    """Django command to discard old upload sessions and their chunks in every schema"""
+
+    help = 'Delete upload sessions older than UPLOAD_SESSION_MAX_AGE, finished or not.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_MAX_AGE)
+        schemas = {get_public_schema_name(), *School.objects.values_list('schema_name', flat=True)}
+        count = 0
+        for schema_name in sorted(schemas):
+            with schema_context(schema_name):
+                for upload in UploadSession.objects.filter(created_at__lt=cutoff):
+                    discard_upload(upload)
+                    count += 1
+        self.stdout.write(self.style.SUCCESS(f'Discarded {count} stale uploads.'))
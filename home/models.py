@@ -1,4 +1,6 @@
+import uuid
 from django.db import models
+from django.contrib.auth.models import User
 from colorfield.fields import ColorField
 
 
@@ -14,4 +16,23 @@ class SchoolSettings(models.Model):
     logo = models.ImageField(upload_to='school_logos/', null=True, blank=True)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class UploadSession(models.Model):
+    PURPOSES = [
+        ('avatar', 'Avatar'),
+        ('logo', 'School logo'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    purpose = models.CharField(max_length=10, choices=PURPOSES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    parts = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.size})'
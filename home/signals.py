@@ -0,0 +1,14 @@
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+from school_manager import metering
+from .models import Item
+
+@receiver(post_save, sender=Item)
+def item_postsave(sender, instance, created, **kwargs):
+    if created:
+        metering.adjust(items=1)
+
+
+@receiver(post_delete, sender=Item)
+def item_postdelete(sender, instance, **kwargs):
+    metering.adjust(items=-1)
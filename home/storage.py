@@ -1,6 +1,7 @@
 from django.core.files.storage import FileSystemStorage
 from django.db import connection
 from django_tenants.files.storage import TenantFileSystemStorage
+from school_manager import metering
 
 
 class CustomSchemaStorage:
@@ -11,9 +12,21 @@ class CustomSchemaStorage:
         else:
             return TenantFileSystemStorage()
 
+    def unmetered(self):
+        # scratch files, e.g. upload chunks, that don't count towards the school's usage
+        return self._get_storage_backend()
+
     def save(self, name, content, max_length=None):
         storage_backend = self._get_storage_backend()
-        return storage_backend.save(name, content, max_length)
+        size = content.size
+        metering.check_storage_quota(size)
+        name = storage_backend.save(name, content, max_length)
+        metering.adjust(bytes_stored=size)
+        return name
+
+    def open(self, name, mode='rb'):
+        storage_backend = self._get_storage_backend()
+        return storage_backend.open(name, mode)
 
     def url(self, name):
         storage_backend = self._get_storage_backend()
@@ -25,4 +38,10 @@ class CustomSchemaStorage:
 
     def delete(self, name):
         storage_backend = self._get_storage_backend()
+        try:
+            size = storage_backend.size(name)
+        except OSError:
+            size = 0
         storage_backend.delete(name)
+        if size:
+            metering.adjust(bytes_stored=-size)
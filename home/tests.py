@@ -1,3 +1,248 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.template import Context, Engine, engines
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.test.client import TenantClient
+from PIL import Image
+from school_manager.metering import count_usage
+from school_manager.models import School
+from .admin import SchoolSettingsForm
+from .loaders import Loader, invalidate_override
+from .models import SchoolSettings, UploadSession
+
+
+def png(size=(64, 64)):
+    image = io.BytesIO()
+    Image.new('RGB', size, 'red').save(image, 'PNG')
+    return image.getvalue()
+
+
+class ChunkedUploadTests(TenantTestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        # TenantTestCase skips the class level settings overrides
+        self.enterContext(override_settings(MEDIA_ROOT=media.name, UPLOAD_CHUNK_SIZE=100, UPLOAD_MAX_SIZE=10_000))
+        self.client = TenantClient(self.tenant)
+        self.user = User.objects.create_user('ama', is_staff=True)
+        self.client.force_login(self.user)
+        self.data = png()
+
+    def start(self, size=None, purpose='avatar'):
+        size = len(self.data) if size is None else size
+        return self.client.post(reverse('upload-start'), {'purpose': purpose, 'filename': 'me.png', 'size': size})
+
+    def put(self, upload_id, chunk, offset):
+        return self.client.put(
+            reverse('upload-chunk', args=[upload_id]), chunk,
+            content_type='application/octet-stream', headers={'X-Upload-Offset': str(offset)},
+        )
+
+    def upload(self, purpose='avatar'):
+        upload_id = self.start(purpose=purpose).json()['id']
+        for offset in range(0, len(self.data), 100):
+            response = self.put(upload_id, self.data[offset:offset + 100], offset)
+        self.assertEqual(response.json(), {'offset': len(self.data)})
+        return upload_id
+
+    def test_start_rejects_files_over_max_size(self):
+        response = self.start(size=10_001)
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_start_rejects_files_over_quota(self):
+        School.objects.filter(pk=self.tenant.pk).update(max_storage_bytes=500)
+        response = self.start(size=501)
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('Storage limit', response.json()['error'])
+
+    def test_chunk_over_chunk_size_is_rejected(self):
+        upload_id = self.start().json()['id']
+        self.assertEqual(self.put(upload_id, self.data[:101], 0).status_code, 413)
+
+    def test_body_is_read_before_the_row_is_locked(self):
+        upload_id = self.start().json()['id']
+
+        with mock.patch('home.views.transaction.atomic', wraps=transaction.atomic) as atomic, \
+                mock.patch('django.core.handlers.wsgi.WSGIRequest.body', new_callable=mock.PropertyMock) as body:
+            body.side_effect = lambda: atomic.assert_not_called() or self.data[:100]
+            response = self.put(upload_id, self.data[:100], 0)
+        self.assertEqual(response.json(), {'offset': 100})
+        atomic.assert_called_once()
+
+    def test_offset_mismatch_returns_current_offset(self):
+        upload_id = self.start().json()['id']
+        self.put(upload_id, self.data[:100], 0)
+        response = self.put(upload_id, self.data[:100], 0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'offset': 100})
+        self.assertEqual(self.client.get(reverse('upload-chunk', args=[upload_id])).json()['offset'], 100)
+
+    def test_bad_first_chunk_is_rejected(self):
+        upload_id = self.start().json()['id']
+        response = self.put(upload_id, b'not an image' * 8, 0)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_finished_upload_waits_for_the_form(self):
+        self.upload()
+        self.user.profile.refresh_from_db()
+        self.assertFalse(self.user.profile.image)
+
+    def test_chunks_are_not_counted_as_stored(self):
+        self.upload()
+        self.assertEqual(count_usage('test')[2], 0)
+
+    def test_stale_uploads_are_cleared(self):
+        stale, fresh = self.upload(), self.upload(purpose='logo')
+        parts = UploadSession.objects.get(pk=stale).parts
+        UploadSession.objects.filter(pk=stale).update(created_at=timezone.now() - datetime.timedelta(days=2))
+
+        call_command('clear_stale_uploads', stdout=io.StringIO())
+
+        self.assertEqual([str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)], [fresh])
+        self.assertFalse(any(default_storage.unmetered().exists(name) for name in parts))
+
+    def test_profile_form_assembles_the_parts(self):
+        upload_id = self.upload()
+        parts = UploadSession.objects.get().parts
+        with mock.patch('users.views.record') as record:
+            response = self.client.post(reverse('profile-edit'), {'image_upload': upload_id, 'displayname': 'Ama'})
+        self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+
+        profile = self.user.profile
+        profile.refresh_from_db()
+        with profile.image.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(os.path.basename(profile.image.name), 'me.png')
+        self.assertIn('image', record.call_args.kwargs['fields'])
+        # the chunks are scratch files, gone once the file is saved
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(any(default_storage.unmetered().exists(name) for name in parts))
+
+    def test_unfinished_upload_is_refused(self):
+        upload_id = self.start().json()['id']
+        self.put(upload_id, self.data[:100], 0)
+        response = self.client.post(reverse('profile-edit'), {'image_upload': upload_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'did not finish')
+
+    def test_others_uploads_are_refused(self):
+        upload_id = self.upload()
+        self.client.force_login(User.objects.create_user('kofi'))
+        response = self.client.post(reverse('profile-edit'), {'image_upload': upload_id})
+        self.assertContains(response, 'did not finish')
+
+    def test_admin_page_wires_uploader(self):
+        self.client.force_login(User.objects.create_superuser('head'))
+        response = self.client.get(reverse('admin:home_schoolsettings_add'))
+        self.assertContains(response, 'js/chunked-upload.js')
+        self.assertContains(response, 'data-chunked-upload="logo"')
+        self.assertContains(response, 'name="logo_upload"')
+
+    def test_admin_form_attaches_logo(self):
+        upload_id = self.upload(purpose='logo')
+        form_class = type('Form', (SchoolSettingsForm,), {'upload_user': self.user})
+        form = form_class({'name': 'Daboya College', 'color': '#FFFFFF', 'logo_upload': upload_id})
+        self.assertTrue(form.is_valid(), form.errors)
+        settings = form.save(commit=False)
+        settings.save()
+        form.save_m2m()
+
+        with SchoolSettings.objects.get().logo.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertFalse(UploadSession.objects.exists())
+
+
+class TenantTemplateLoaderTests(SimpleTestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = Path(root.name)
+        self.write('templates/greeting.html', '{% block text %}Hello{% endblock %}')
+        self.write('templates/footer.html', 'Footer')
+        self.write('overrides/amass/greeting.html', 'Akwaaba')
+        self.write('overrides/amass/footer.html', 'Amass footer')
+        self.enterContext(override_settings(
+            TENANT_TEMPLATES_DIR=self.root / 'overrides', TENANT_TEMPLATES_CHECK_INTERVAL=3600,
+        ))
+        self.engine = Engine(
+            dirs=[str(self.root / 'templates')],
+            loaders=[('home.loaders.Loader', ['django.template.loaders.filesystem.Loader'])],
+        )
+        self.loader = self.engine.template_loaders[0]
+        self.addCleanup(connection.set_schema_to_public)
+
+    def write(self, name, content):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        return path
+
+    def render(self, name, schema_name='amass'):
+        connection.set_schema(schema_name)
+        return self.engine.get_template(name).render(Context())
+
+    def test_override_per_schema(self):
+        self.assertEqual(self.render('greeting.html'), 'Akwaaba')
+        self.assertEqual(self.render('greeting.html', 'other'), 'Hello')
+        connection.set_schema_to_public()
+        self.assertEqual(self.engine.get_template('greeting.html').render(Context()), 'Hello')
+
+    def test_override_can_extend_the_template_it_replaces(self):
+        self.write(
+            'overrides/amass/greeting.html',
+            "{% extends 'greeting.html' %}{% block text %}{{ block.super }}, Ama{% endblock %}",
+        )
+        self.assertEqual(self.render('greeting.html'), 'Hello, Ama')
+
+    def test_misses_are_cached(self):
+        with mock.patch.object(self.loader, 'load_override', wraps=self.loader.load_override) as load:
+            self.render('greeting.html', 'other')
+            self.render('greeting.html', 'other')
+        load.assert_called_once_with('other', 'greeting.html')
+
+    def test_path_traversal_is_ignored(self):
+        self.assertEqual(self.loader.get_override('amass', '../../templates/footer.html'), None)
+
+    def test_revalidate_drops_only_changed_entries(self):
+        self.render('greeting.html')
+        self.render('footer.html')
+        footer = self.loader.overrides['amass']['footer.html']
+
+        path = self.write('overrides/amass/greeting.html', 'Maakye')
+        os.utime(path, ns=(0, 0))
+        # not rechecked within the interval
+        self.assertEqual(self.render('greeting.html'), 'Akwaaba')
+
+        with override_settings(TENANT_TEMPLATES_CHECK_INTERVAL=0):
+            self.assertEqual(self.render('greeting.html'), 'Maakye')
+        self.assertIs(self.loader.overrides['amass']['footer.html'], footer)
+
+    def test_invalidate_override(self):
+        loader = next(loader for loader in engines['django'].engine.template_loaders if isinstance(loader, Loader))
+        self.addCleanup(loader.reset)
+        loader.overrides.update({
+            'amass': {'greeting.html': (None, None, None), 'footer.html': (None, None, None)},
+            'other': {'greeting.html': (None, None, None)},
+        })
+
+        invalidate_override('amass', 'greeting.html')
+        self.assertEqual(set(loader.overrides['amass']), {'footer.html'})
+        invalidate_override('amass')
+        self.assertNotIn('amass', loader.overrides)
+        self.assertIn('greeting.html', loader.overrides['other'])
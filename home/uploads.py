@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from PIL import Image, UnidentifiedImageError
+from .models import UploadSession
+
+
+def check_image_header(fileobj):
+    """
+    Validate an image from its header only. Image.open reads just enough to
+    know the format and size, the pixels are never decoded.
+    """
+    position = fileobj.tell() if hasattr(fileobj, 'tell') else None
+    try:
+        with Image.open(fileobj) as image:
+            image_format, (width, height) = image.format, image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise ValidationError('Upload a valid image.')
+    finally:
+        if position is not None:
+            fileobj.seek(position)
+
+    if image_format not in settings.UPLOAD_IMAGE_FORMATS:
+        raise ValidationError(f'{image_format} images are not supported.')
+    max_dimension = settings.UPLOAD_MAX_IMAGE_DIMENSION
+    if width > max_dimension or height > max_dimension:
+        raise ValidationError(f'Images can be at most {max_dimension}x{max_dimension} pixels.')
+    return image_format, width, height
+
+
+class JoinedParts(File):
+    """Read stored chunk files back to back without loading them into memory."""
+
+    def __init__(self, storage, names, size, name=None):
+        super().__init__(None, name)
+        self.storage = storage
+        self.names = names
+        self.size = size
+
+    def chunks(self, chunk_size=None):
+        chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        for name in self.names:
+            with self.storage.open(name) as part:
+                while data := part.read(chunk_size):
+                    yield data
+
+    def close(self):
+        pass
+
+
+def discard_upload(upload):
+    storage = default_storage.unmetered()
+    for name in upload.parts:
+        storage.delete(name)
+    upload.delete()
+
+
+class ChunkedUploadMixin:
+    """
+    For model forms whose file inputs use static/js/chunked-upload.js.
+
+    The script leaves the id of the finished UploadSession in the form's
+    hidden <field>_upload UUIDField. The file is assembled from the stored
+    chunks only when the form is saved, so leaving the form discards it.
+    """
+
+    # file field name -> UploadSession purpose
+    chunked_uploads = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.uploads = []
+        for field, purpose in self.chunked_uploads.items():
+            self.fields[field].widget.attrs['data-chunked-upload'] = purpose
+
+    def get_upload_user(self):
+        raise NotImplementedError
+
+    @property
+    def changed_data(self):
+        # report the file field rather than the hidden input that carried it
+        hidden = {f'{field}_upload': field for field in self.chunked_uploads}
+        return [hidden.get(name, name) for name in super().changed_data]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, purpose in self.chunked_uploads.items():
+            upload_id = cleaned_data.get(f'{field}_upload')
+            if not upload_id:
+                continue
+            upload = UploadSession.objects.filter(
+                pk=upload_id, user=self.get_upload_user(), purpose=purpose,
+            ).first()
+            if upload is None or upload.received < upload.size:
+                self.add_error(field, 'The upload did not finish, please choose the file again.')
+                continue
+            self.uploads.append(upload)
+            cleaned_data[field] = JoinedParts(
+                default_storage.unmetered(), upload.parts, upload.size, name=upload.filename,
+            )
+        return cleaned_data
+
+    def save(self, commit=True):
+        instance = super().save(commit)
+        if commit:
+            self.discard_uploads()
+        else:
+            # the admin saves the instance itself, then calls save_m2m
+            save_m2m = self.save_m2m
+
+            def save_related():
+                save_m2m()
+                self.discard_uploads()
+            self.save_m2m = save_related
+        return instance
+
+    def discard_uploads(self):
+        for upload in self.uploads:
+            discard_upload(upload)
+        self.uploads = []
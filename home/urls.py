@@ -4,4 +4,6 @@ from home.views import *
 urlpatterns = [
     path('', home_view, name="home"),
     path('create-item/', create_item_view, name="create-item"),  
+    path('uploads/', upload_start_view, name="upload-start"),
+    path('uploads/<uuid:pk>/', upload_chunk_view, name="upload-chunk"),
 ]
@@ -1,6 +1,18 @@
-from django.shortcuts import render, redirect
-from django.http import HttpResponse
+import io
+import os
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.views.decorators.http import require_POST
+from audit.events import record
+from school_manager.metering import check_storage_quota, QuotaExceeded
 from .models import *
+from .uploads import check_image_header, discard_upload
 
 
 def home_view(request):
@@ -13,6 +25,86 @@ def create_item_view(request):
     if request.method == 'POST':
         name = request.POST.get('name')
         item = Item.objects.create(name=name)
+        record(request, 'item.create', item, name=name)
         return HttpResponse(f'<li class="text-8xl font-thin">{item.name}</li>')
     else:
-        return redirect('home')
\ No newline at end of file
+        return redirect('home')
+
+
+@login_required
+@require_POST
+def upload_start_view(request):
+    purpose = request.POST.get('purpose')
+    if purpose not in dict(UploadSession.PURPOSES):
+        return JsonResponse({'error': 'Unknown upload.'}, status=400)
+    if purpose == 'logo' and not request.user.is_staff:
+        return JsonResponse({'error': 'Not allowed.'}, status=403)
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Missing size.'}, status=400)
+
+    # refuse before a single byte is sent
+    if size <= 0 or size > settings.UPLOAD_MAX_SIZE:
+        limit = settings.UPLOAD_MAX_SIZE // (1024 * 1024)
+        return JsonResponse({'error': f'Files can be at most {limit} MB.'}, status=413)
+    try:
+        check_storage_quota(size)
+    except QuotaExceeded as e:
+        return JsonResponse({'error': str(e)}, status=413)
+
+    # a new upload replaces any unfinished one the client gave up on
+    for stale in UploadSession.objects.filter(user=request.user, purpose=purpose):
+        discard_upload(stale)
+
+    upload = UploadSession.objects.create(
+        user=request.user,
+        purpose=purpose,
+        filename=os.path.basename(request.POST.get('filename', 'upload'))[:255],
+        size=size,
+    )
+    return JsonResponse({'id': str(upload.id), 'offset': 0, 'chunk_size': settings.UPLOAD_CHUNK_SIZE})
+
+
+@login_required
+def upload_chunk_view(request, pk):
+    if request.method == 'GET':
+        upload = get_object_or_404(UploadSession, pk=pk, user=request.user)
+        return JsonResponse({'offset': upload.received, 'chunk_size': settings.UPLOAD_CHUNK_SIZE})
+    if request.method != 'PUT':
+        return HttpResponseNotAllowed(['GET', 'PUT'])
+
+    # checked before the body is read
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if not 0 < length <= settings.UPLOAD_CHUNK_SIZE:
+        return JsonResponse({'error': 'Bad chunk size.'}, status=413)
+    # read the whole chunk before taking the row lock, a slow client must not hold a transaction open
+    chunk = request.body
+
+    with transaction.atomic():
+        upload = get_object_or_404(
+            UploadSession.objects.select_for_update(), pk=pk, user=request.user,
+        )
+        offset = request.headers.get('X-Upload-Offset')
+        if offset != str(upload.received):
+            # a retried or out of order chunk, tell the client where to resume
+            return JsonResponse({'offset': upload.received}, status=409)
+        if upload.received + len(chunk) > upload.size:
+            return JsonResponse({'error': 'More data than announced.'}, status=413)
+
+        if upload.received == 0:
+            try:
+                check_image_header(io.BytesIO(chunk))
+            except ValidationError as e:
+                discard_upload(upload)
+                return JsonResponse({'error': e.messages[0]}, status=400)
+
+        name = default_storage.unmetered().save(
+            f'uploads/{upload.id}/{len(upload.parts):05d}.part', ContentFile(chunk),
+        )
+        upload.parts.append(name)
+        upload.received += len(chunk)
+        upload.save(update_fields=['parts', 'received'])
+
+    # once complete, the form that started the upload attaches it on submit
+    return JsonResponse({'offset': upload.received})
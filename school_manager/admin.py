@@ -1,15 +1,67 @@
+import datetime
+
 from django.contrib import admin
-from .models import School, Domain
+from django.db.models import Sum
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.urls import path
+from .models import School, Domain, Usage, SchoolStats, WeeklySignups
+from .profiling import profiles
 
 
 class SchoolAdminSite(admin.AdminSite):
     site_header = "School Management Admin"
     site_title = "School Management Portal"
     index_title = "Welcome to the School Management Admin Area"
+    index_template = "school_manager/index.html"
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.register(School)
         self.register(Domain)
+        self.register(Usage)
+
+    def get_urls(self):
+        urls = [
+            path('profiles/', self.admin_view(self.profiles_view), name='profiles'),
+            path('profiles/<int:profile_id>/', self.admin_view(self.profile_view), name='profile'),
+            path('stats/', self.admin_view(self.stats_view), name='stats'),
+        ]
+        return urls + super().get_urls()
+
+    def stats_view(self, request):
+        # reads only the summary tables, refresh_school_stats fills them
+        names = dict(School.objects.values_list('schema_name', 'name'))
+        stats = [
+            {'name': names.get(row.schema_name, row.schema_name), 'stats': row}
+            for row in SchoolStats.objects.order_by('-user_count')
+        ]
+        since = datetime.date.today() - datetime.timedelta(weeks=12)
+        weeks = (
+            WeeklySignups.objects.filter(week__gte=since)
+            .values('week').annotate(signups=Sum('signups')).order_by('week')
+        )
+        context = {
+            **self.each_context(request),
+            'title': 'School statistics',
+            'schools': stats,
+            'weeks': weeks,
+            'totals': SchoolStats.objects.aggregate(users=Sum('user_count'), items=Sum('item_count')),
+            'refreshed_on': stats[0]['stats'].refreshed_on if stats else None,
+        }
+        return TemplateResponse(request, 'school_manager/stats.html', context)
+
+    def profiles_view(self, request):
+        if not request.user.is_superuser:
+            raise Http404
+        context = {**self.each_context(request), 'title': 'Request profiles', 'profiles': profiles.all()}
+        return TemplateResponse(request, 'school_manager/profiles.html', context)
+
+    def profile_view(self, request, profile_id):
+        entry = profiles.get(profile_id)
+        if not request.user.is_superuser or entry is None:
+            raise Http404
+        context = {**self.each_context(request), 'title': f"Profile of {entry['path']}", 'profile': entry}
+        return TemplateResponse(request, 'school_manager/profile.html', context)
 
 school_admin_site = SchoolAdminSite(name='school_admin')
\ No newline at end of file
@@ -0,0 +1,133 @@
+import datetime
+import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django_tenants.utils import get_public_schema_name
+from .models import School, SchoolStats, WeeklySignups
+
+# tables every tenant schema needs for the report
+REQUIRED_TABLES = ('auth_user', 'home_item')
+
+
+def _read_alias():
+    if settings.DATABASE_REPLICAS:
+        return random.choice(settings.DATABASE_REPLICAS)
+    return DEFAULT_DB_ALIAS
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def tenant_schemas():
+    """School schemas that have all the tables the report reads."""
+    schemas = list(
+        School.objects.exclude(schema_name=get_public_schema_name())
+        .values_list('schema_name', flat=True)
+    )
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(
+            'SELECT table_schema FROM information_schema.tables '
+            'WHERE table_schema = ANY(%s) AND table_name = ANY(%s) '
+            'GROUP BY table_schema HAVING count(*) = %s',
+            [schemas, list(REQUIRED_TABLES), len(REQUIRED_TABLES)],
+        )
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def totals_query(schemas, quote):
+    parts, params = [], []
+    for schema in schemas:
+        q = quote(schema)
+        parts.append(
+            f'SELECT %s, (SELECT count(*) FROM {q}.auth_user), (SELECT count(*) FROM {q}.home_item)'
+        )
+        params.append(schema)
+    return ' UNION ALL '.join(parts), params
+
+
+def signups_query(schemas, quote, since):
+    parts, params = [], []
+    for schema in schemas:
+        parts.append(
+            f"SELECT %s, date_trunc('week', date_joined)::date, count(*) "
+            f'FROM {quote(schema)}.auth_user WHERE date_joined >= %s GROUP BY 2'
+        )
+        params += [schema, since]
+    return ' UNION ALL '.join(parts), params
+
+
+def _run(sql, params):
+    # runs in a worker thread with its own connection, tables are schema qualified
+    connection = connections[_read_alias()]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+    finally:
+        connection.close()
+
+
+def _run_chunks(build, schemas, chunk_size, workers):
+    quote = connections[DEFAULT_DB_ALIAS].ops.quote_name
+    queries = [build(chunk, quote) for chunk in _chunks(schemas, chunk_size)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda query: _run(*query), queries)
+        return [row for rows in results for row in rows]
+
+
+def refresh(full=False, chunk_size=50, workers=4):
+    """
+    Refresh SchoolStats and WeeklySignups with one UNION ALL query per chunk
+    of schemas. Unless full, signups are only recounted from the latest
+    stored week onwards, earlier weeks are left as they are. Schemas with no
+    stored weeks yet, e.g. new schools, are always counted from the start.
+    """
+    schemas = tenant_schemas()
+    now = timezone.now()
+    start = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+    stored = WeeklySignups.objects.filter(schema_name__in=schemas)
+    counted = set() if full else set(stored.values_list('schema_name', flat=True).distinct())
+    latest = stored.aggregate(latest=Max('week'))['latest'] if counted else None
+    if latest is None:
+        since = start
+    else:
+        since = datetime.datetime.combine(latest, datetime.time.min, tzinfo=datetime.timezone.utc)
+
+    totals = _run_chunks(totals_query, schemas, chunk_size, workers)
+    ongoing = [schema for schema in schemas if schema in counted]
+    new = [schema for schema in schemas if schema not in counted]
+    weeks = (
+        _run_chunks(partial(signups_query, since=since), ongoing, chunk_size, workers)
+        + _run_chunks(partial(signups_query, since=start), new, chunk_size, workers)
+    )
+
+    # swap the summary in one transaction so the dashboard never reads it half written
+    with transaction.atomic():
+        SchoolStats.objects.bulk_create(
+            [SchoolStats(schema_name=schema, user_count=users, item_count=items, refreshed_on=now)
+             for schema, users, items in totals],
+            update_conflicts=True,
+            unique_fields=['schema_name'],
+            update_fields=['user_count', 'item_count', 'refreshed_on'],
+        )
+        SchoolStats.objects.exclude(schema_name__in=schemas).delete()
+
+        if full:
+            WeeklySignups.objects.all().delete()
+        else:
+            WeeklySignups.objects.exclude(schema_name__in=schemas).delete()
+        WeeklySignups.objects.bulk_create(
+            [WeeklySignups(schema_name=schema, week=week, signups=count) for schema, week, count in weeks],
+            update_conflicts=True,
+            unique_fields=['week', 'schema_name'],
+            update_fields=['signups'],
+        )
+    return len(schemas)
@@ -0,0 +1,30 @@
+"""
+Django command to refresh the cross-tenant summary tables
+"""
+
+from django.core.management.base import BaseCommand
+
+from school_manager import aggregates
+
+
+class Command(BaseCommand):
+    """Django command to aggregate users, items and sign-ups across schools"""
+
+    help = 'Refresh SchoolStats and WeeklySignups from every tenant schema.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recount every week instead of only the latest ones.')
+        parser.add_argument('--chunk-size', type=int, default=50,
+                            help='Schemas per UNION ALL query.')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Chunks queried concurrently.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        count = aggregates.refresh(
+            full=options['full'],
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Refreshed stats for {count} schools.'))
@@ -0,0 +1,109 @@
+import os
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django_tenants.utils import get_public_schema_name, schema_context
+from .models import School, Usage
+
+
+class QuotaExceeded(PermissionDenied):
+    pass
+
+
+def directory_size(path, exclude=()):
+    """Total size in bytes of all files below path, skipping the exclude directories."""
+    total = 0
+    try:
+        entries = list(os.scandir(path))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.path not in exclude:
+                total += directory_size(entry.path, exclude)
+        elif entry.is_file(follow_symlinks=False):
+            total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+def tenant_media_path(schema_name):
+    relative = settings.MULTITENANT_RELATIVE_MEDIA_ROOT % schema_name
+    return os.path.join(settings.MEDIA_ROOT, relative)
+
+
+def count_usage(schema_name):
+    """Count a schema's users, items and stored bytes from scratch."""
+    # imported here, home's storage and signals import this module
+    from django.contrib.auth.models import User
+    from home.models import Item
+
+    with schema_context(schema_name):
+        users = User.objects.count()
+        items = Item.objects.count()
+
+    if schema_name == get_public_schema_name():
+        # public files live at the media root, next to the tenant folders
+        root = str(settings.MEDIA_ROOT)
+        exclude = [os.path.dirname(tenant_media_path('x'))]
+    else:
+        root = tenant_media_path(schema_name)
+        exclude = []
+    # chunks of unfinished uploads are unmetered scratch files
+    exclude.append(os.path.join(root, 'uploads'))
+    return users, items, directory_size(root, exclude)
+
+
+def adjust(schema_name=None, users=0, items=0, bytes_stored=0):
+    """Add the given deltas to a schema's usage row with a single UPDATE."""
+    schema_name = schema_name or connection.schema_name
+    changes = {
+        'user_count': F('user_count') + users,
+        'item_count': F('item_count') + items,
+        'bytes_stored': F('bytes_stored') + bytes_stored,
+    }
+    if Usage.objects.filter(schema_name=schema_name).update(**changes):
+        return
+
+    # first event for this schema, which may have users and files from before
+    # metering; callers adjust after the change, so the count includes it
+    user_count, item_count, stored = count_usage(schema_name)
+    try:
+        with transaction.atomic():
+            Usage.objects.create(
+                schema_name=schema_name,
+                user_count=user_count,
+                item_count=item_count,
+                bytes_stored=stored,
+            )
+    except IntegrityError:
+        # another process created it first
+        Usage.objects.filter(schema_name=schema_name).update(**changes)
+
+
+def get_limits(schema_name=None):
+    """Quotas and current counters for a schema, fetched in one indexed lookup."""
+    schema_name = schema_name or connection.schema_name
+    usage = Usage.objects.filter(schema_name=OuterRef('schema_name'))
+    return School.objects.filter(schema_name=schema_name).annotate(
+        user_count=Coalesce(Subquery(usage.values('user_count')), 0),
+        bytes_stored=Coalesce(Subquery(usage.values('bytes_stored')), 0),
+    ).values('max_users', 'max_storage_bytes', 'user_count', 'bytes_stored').first()
+
+
+def check_storage_quota(size, schema_name=None):
+    limits = get_limits(schema_name)
+    if not limits or limits['max_storage_bytes'] is None:
+        return
+    if limits['bytes_stored'] + size > limits['max_storage_bytes']:
+        raise QuotaExceeded('Storage limit reached for this school.')
+
+
+def check_user_quota(count=1, schema_name=None):
+    limits = get_limits(schema_name)
+    if not limits or limits['max_users'] is None:
+        return
+    if limits['user_count'] + count > limits['max_users']:
+        raise QuotaExceeded('User limit reached for this school.')
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("school_manager", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="school",
+            name="max_users",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="school",
+            name="max_storage_bytes",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="Usage",
+            fields=[
+                (
+                    "schema_name",
+                    models.CharField(max_length=63, primary_key=True, serialize=False),
+                ),
+                ("user_count", models.IntegerField(default=0)),
+                ("item_count", models.IntegerField(default=0)),
+                ("bytes_stored", models.BigIntegerField(default=0)),
+                ("reconciled_on", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
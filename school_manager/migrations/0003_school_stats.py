@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school_manager', '0002_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolStats',
+            fields=[
+                ('schema_name', models.CharField(max_length=63, primary_key=True, serialize=False)),
+                ('user_count', models.IntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('refreshed_on', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WeeklySignups',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('schema_name', models.CharField(max_length=63)),
+                ('week', models.DateField()),
+                ('signups', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('week', 'schema_name'), name='unique_weekly_signups')],
+            },
+        ),
+    ]
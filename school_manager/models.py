@@ -5,8 +5,46 @@ class School(TenantMixin):
     name = models.CharField(max_length=100)
     created_on = models.DateField(auto_now_add=True)
 
+    # billing caps, null means unlimited
+    max_users = models.PositiveIntegerField(null=True, blank=True)
+    max_storage_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+
     # default true, schema will be automatically created and synced when it is saved
     auto_create_schema = True
 
 class Domain(DomainMixin):
-    pass
\ No newline at end of file
+    pass
+
+
+class Usage(models.Model):
+    # one narrow row per schema, keyed by schema name so metering never needs a join
+    schema_name = models.CharField(max_length=63, primary_key=True)
+    user_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    bytes_stored = models.BigIntegerField(default=0)
+    reconciled_on = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.schema_name
+
+
+class SchoolStats(models.Model):
+    # summary refreshed by school_manager.aggregates, read by the /dev/ dashboard
+    schema_name = models.CharField(max_length=63, primary_key=True)
+    user_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    refreshed_on = models.DateTimeField()
+
+    def __str__(self):
+        return self.schema_name
+
+
+class WeeklySignups(models.Model):
+    schema_name = models.CharField(max_length=63)
+    week = models.DateField()
+    signups = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['week', 'schema_name'], name='unique_weekly_signups'),
+        ]
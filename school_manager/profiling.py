@@ -0,0 +1,117 @@
+import cProfile
+import io
+import itertools
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = '_profile'
+
+
+class ProfileBuffer:
+    """
+    Last N request profiles of this process. Each server process keeps its
+    own buffer, so a profile is only visible from the process that served it.
+    """
+
+    def __init__(self, size):
+        self.entries = deque(maxlen=size)
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def add(self, entry):
+        with self.lock:
+            entry['id'] = next(self.ids)
+            self.entries.appendleft(entry)
+        return entry['id']
+
+    def all(self):
+        with self.lock:
+            return list(self.entries)
+
+    def get(self, profile_id):
+        for entry in self.all():
+            if entry['id'] == profile_id:
+                return entry
+        return None
+
+
+profiles = ProfileBuffer(settings.PROFILER_BUFFER_SIZE)
+
+# cProfile allows one active profiler per process on Python 3.12+
+_active = threading.Lock()
+
+
+def _wants_profile(request):
+    # this runs on every request, only parse the query string when the name is in it
+    if PROFILE_HEADER in request.META:
+        return True
+    return PROFILE_PARAM in request.META.get('QUERY_STRING', '') and PROFILE_PARAM in request.GET
+
+
+class ProfilerMiddleware:
+    """
+    Profile a request with cProfile when a superuser sends an X-Profile
+    header or a ?_profile query flag, and keep the stats and the SQL it ran.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _wants_profile(request) or not request.user.is_superuser:
+            return self.get_response(request)
+        if not _active.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            _active.release()
+
+    def profile(self, request):
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            # reads may be routed to replicas, capture every alias
+            captures = {
+                alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in connections
+            }
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+        queries = [
+            {**query, 'alias': alias}
+            for alias, capture in captures.items()
+            for query in capture.captured_queries
+        ]
+
+        stats_output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stats_output)
+        stats.sort_stats('cumulative').print_stats(settings.PROFILER_TOP_FUNCTIONS)
+
+        profile_id = profiles.add({
+            'created': timezone.now(),
+            'schema_name': connection.schema_name,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'user': request.user.get_username(),
+            'status': response.status_code,
+            'duration': duration,
+            'stats': stats_output.getvalue(),
+            'queries': queries,
+            'query_time': sum(float(query['time']) for query in queries),
+        })
+        response['X-Profile-Id'] = str(profile_id)
+        return response
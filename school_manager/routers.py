@@ -0,0 +1,86 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+
+# set for the rest of a request once it has written, or when the client wrote recently
+_pinned = ContextVar('db_pinned', default=False)
+# set once the current request has written, the pin cookie is then reissued
+_wrote = ContextVar('db_wrote', default=False)
+
+
+def pin_to_primary():
+    _pinned.set(True)
+    _wrote.set(True)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+class ReplicaRouter:
+    """
+    Send reads to a read replica and writes to the primary.
+
+    Composes with django_tenants.routers.TenantSyncRouter, which keeps
+    deciding migrations. Each replica connection is switched to the tenant
+    of the primary connection before use so it gets the same search_path.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned():
+            return DEFAULT_DB_ALIAS
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.in_atomic_block:
+            # reads inside a transaction must see its own writes
+            return DEFAULT_DB_ALIAS
+        alias = random.choice(replicas)
+        replica = connections[alias]
+        if replica.schema_name != primary.schema_name:
+            replica.set_tenant(primary.tenant, primary.include_public_schema)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaPinMiddleware:
+    """
+    Read from the primary for REPLICA_PIN_SECONDS after a client writes,
+    so users always see their own changes despite replication lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned_until = request.COOKIES.get(PIN_COOKIE)
+        try:
+            pinned = float(pinned_until) > time.time()
+        except (TypeError, ValueError):
+            pinned = False
+        pinned_token = _pinned.set(pinned)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote.get():
+                # every write restarts the window, also while the client is still pinned
+                seconds = settings.REPLICA_PIN_SECONDS
+                response.set_cookie(
+                    PIN_COOKIE, str(time.time() + seconds),
+                    max_age=seconds, httponly=True, samesite='Lax',
+                )
+        finally:
+            _wrote.reset(wrote_token)
+            _pinned.reset(pinned_token)
+        return response
@@ -1,3 +1,404 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import tempfile
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.test.client import TenantClient
+from django_tenants.utils import schema_context
+from home.models import Item
+from .aggregates import refresh, signups_query, totals_query
+from .metering import QuotaExceeded, adjust, check_storage_quota, check_user_quota, tenant_media_path
+from .models import School, SchoolStats, Usage, WeeklySignups
+from .profiling import ProfileBuffer
+from .routers import PIN_COOKIE, ReplicaPinMiddleware, ReplicaRouter, _pinned, is_pinned, pin_to_primary
+
+
+# run with DB_REPLICA_HOSTS set, e.g. docker compose run --rm test
+@skipUnless(settings.DATABASE_REPLICAS, 'no read replica configured')
+class ReplicaRouterTests(SimpleTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.token = _pinned.set(False)
+
+    def tearDown(self):
+        _pinned.reset(self.token)
+        connection.set_schema_to_public()
+
+    def test_reads_go_to_replica(self):
+        self.assertIn(self.router.db_for_read(Item), settings.DATABASE_REPLICAS)
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Item), 'default')
+
+    def test_reads_pinned_after_write(self):
+        self.router.db_for_write(Item)
+        self.assertEqual(self.router.db_for_read(Item), 'default')
+
+    def test_replica_follows_tenant_schema(self):
+        connection.set_schema('amass')
+        alias = self.router.db_for_read(Item)
+        self.assertEqual(connections[alias].schema_name, 'amass')
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SHOW search_path')
+            self.assertEqual(cursor.fetchone()[0].split(',')[0].strip(), 'amass')
+
+
+class ReplicaPinMiddlewareTests(SimpleTestCase):
+
+    def request(self, pinned_until=None):
+        request = RequestFactory().get('/')
+        if pinned_until is not None:
+            request.COOKIES[PIN_COOKIE] = str(pinned_until)
+        return request
+
+    def test_sets_pin_cookie_after_write(self):
+        def view(request):
+            pin_to_primary()
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(view)(self.request())
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_pins_reads_from_cookie(self):
+        def view(request):
+            return HttpResponse(str(is_pinned()))
+
+        response = ReplicaPinMiddleware(view)(self.request(time.time() + 60))
+        self.assertEqual(response.content, b'True')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_expired_cookie_does_not_pin(self):
+        def view(request):
+            return HttpResponse(str(is_pinned()))
+
+        response = ReplicaPinMiddleware(view)(self.request(time.time() - 1))
+        self.assertEqual(response.content, b'False')
+
+    def test_write_while_pinned_extends_cookie(self):
+        def view(request):
+            pin_to_primary()
+            return HttpResponse()
+
+        now = time.time()
+        response = ReplicaPinMiddleware(view)(self.request(now + 1))
+        self.assertGreaterEqual(
+            float(response.cookies[PIN_COOKIE].value), now + settings.REPLICA_PIN_SECONDS,
+        )
+
+    def test_pin_does_not_leak_between_requests(self):
+        def write(request):
+            pin_to_primary()
+            return HttpResponse()
+
+        token = _pinned.set(False)
+        try:
+            ReplicaPinMiddleware(write)(self.request())
+            self.assertFalse(is_pinned())
+        finally:
+            _pinned.reset(token)
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'no read replica configured')
+class ReplicaQueryTests(TransactionTestCase):
+    """
+    The replica test database is a second, unreplicated database, so a row
+    written to only one side shows which database a query was sent to.
+    """
+    databases = '__all__'
+    schemas = ('replica_a', 'replica_b')
+
+    def setUp(self):
+        self.replica = settings.DATABASE_REPLICAS[0]
+        for alias in (DEFAULT_DB_ALIAS, self.replica):
+            for schema in self.schemas:
+                self.create_schema(alias, schema)
+        self.token = _pinned.set(False)
+
+    def tearDown(self):
+        _pinned.reset(self.token)
+        for alias in (DEFAULT_DB_ALIAS, self.replica):
+            connections[alias].set_schema_to_public()
+            with connections[alias].cursor() as cursor:
+                for schema in self.schemas:
+                    cursor.execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+
+    def create_schema(self, alias, schema):
+        db = connections[alias]
+        with db.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA {schema}')
+        db.set_schema(schema)
+        with db.schema_editor() as editor:
+            editor.create_model(Item)
+        db.set_schema_to_public()
+
+    def add_item(self, alias, schema, name):
+        connections[alias].set_schema(schema)
+        Item.objects.using(alias).create(name=name)
+
+    def names(self):
+        return list(Item.objects.order_by('name').values_list('name', flat=True))
+
+    def test_reads_come_from_replica(self):
+        self.add_item(DEFAULT_DB_ALIAS, 'replica_a', 'on primary')
+        self.add_item(self.replica, 'replica_a', 'on replica')
+        _pinned.set(False)
+        self.assertEqual(self.names(), ['on replica'])
+
+    def test_pinned_reads_come_from_primary(self):
+        self.add_item(self.replica, 'replica_a', 'on replica')
+        connection.set_schema('replica_a')
+        Item.objects.create(name='on primary')
+        self.assertEqual(self.names(), ['on primary'])
+
+    def test_replica_search_path_follows_tenant(self):
+        self.add_item(self.replica, 'replica_a', 'school a')
+        self.add_item(self.replica, 'replica_b', 'school b')
+        _pinned.set(False)
+        for schema, names in (('replica_a', ['school a']), ('replica_b', ['school b'])):
+            connection.set_schema(schema)
+            self.assertEqual(self.names(), names)
+            with connections[self.replica].cursor() as cursor:
+                cursor.execute('SHOW search_path')
+                self.assertEqual(cursor.fetchone()[0].split(',')[0].strip(), schema)
+
+    def test_transaction_reads_stay_on_primary(self):
+        self.add_item(self.replica, 'replica_a', 'on replica')
+        connection.set_schema('replica_a')
+        with transaction.atomic():
+            Item.objects.create(name='on primary')
+            _pinned.set(False)
+            self.assertEqual(ReplicaRouter().db_for_read(Item), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.names(), ['on primary'])
+
+
+class MeteringTests(TenantTestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def usage(self, schema_name='test'):
+        usage = Usage.objects.get(schema_name=schema_name)
+        return usage.user_count, usage.item_count, usage.bytes_stored
+
+    def set_limits(self, **limits):
+        School.objects.filter(pk=self.tenant.pk).update(**limits)
+
+    def test_first_event_counts_existing_usage(self):
+        User.objects.create_user('ama')
+        Item.objects.create(name='Chemistry')
+        path = os.path.join(tenant_media_path('test'), 'logo.png')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(b'x' * 10)
+        # as for a school that had users and files before metering
+        Usage.objects.all().delete()
+
+        User.objects.create_user('kofi')
+        self.assertEqual(self.usage(), (2, 1, 10))
+
+    def test_deltas_are_added(self):
+        Usage.objects.create(schema_name='amass')
+        adjust('amass', items=3)
+        adjust('amass', items=2, bytes_stored=50)
+        adjust('amass', items=-4, bytes_stored=-20)
+        self.assertEqual(self.usage('amass'), (0, 1, 30))
+
+    def test_defaults_to_current_schema(self):
+        Usage.objects.create(schema_name='test')
+        adjust(items=1)
+        self.assertEqual(self.usage(), (0, 1, 0))
+
+    def test_storage_quota(self):
+        self.set_limits(max_storage_bytes=100)
+        Usage.objects.create(schema_name='test')
+        adjust(bytes_stored=60)
+        check_storage_quota(40)
+        with self.assertRaises(QuotaExceeded):
+            check_storage_quota(41)
+
+    def test_no_limits(self):
+        adjust(users=10, bytes_stored=10 ** 9)
+        check_storage_quota(10 ** 9)
+        check_user_quota()
+
+    def test_user_quota_blocks_new_users(self):
+        self.set_limits(max_users=1)
+        user = User.objects.create_user('ama')
+        with self.assertRaises(QuotaExceeded):
+            User.objects.create_user('kofi')
+        self.assertEqual(User.objects.count(), 1)
+        # existing users can still be saved
+        user.first_name = 'Ama'
+        user.save()
+
+
+class ProfilerTests(TenantTestCase):
+
+    def setUp(self):
+        self.client = TenantClient(self.tenant)
+        self.profiles = ProfileBuffer(10)
+        self.enterContext(mock.patch('school_manager.profiling.profiles', self.profiles))
+
+    def test_superuser_is_profiled(self):
+        self.client.force_login(User.objects.create_superuser('root'))
+        response = self.client.get(reverse('audit-log'), {'_profile': ''})
+
+        entry = self.profiles.get(int(response['X-Profile-Id']))
+        self.assertEqual(entry['schema_name'], 'test')
+        self.assertEqual(entry['path'], '/audit/?_profile=')
+        self.assertTrue(any('audit_auditevent' in query['sql'] for query in entry['queries']))
+
+    def test_other_users_are_not_profiled(self):
+        self.client.force_login(User.objects.create_user('head', is_staff=True))
+        response = self.client.get(reverse('audit-log'), HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.profiles.all(), [])
+
+    def test_param_must_be_the_flag_itself(self):
+        self.client.force_login(User.objects.create_superuser('root'))
+        for params in [{'no_profile': '1'}, {'action': '_profile'}]:
+            response = self.client.get(reverse('audit-log'), params)
+            self.assertNotIn('X-Profile-Id', response)
+
+    def test_buffer_drops_oldest(self):
+        profiles = ProfileBuffer(settings.PROFILER_BUFFER_SIZE)
+        for _ in range(settings.PROFILER_BUFFER_SIZE + 1):
+            profiles.add({})
+        self.assertEqual(len(profiles.all()), settings.PROFILER_BUFFER_SIZE)
+        self.assertIsNone(profiles.get(1))
+        self.assertEqual(profiles.all()[0]['id'], settings.PROFILER_BUFFER_SIZE + 1)
+
+    def test_profiles_page_is_for_superusers_only(self):
+        # the dev admin is served from the public schema, the context also
+        # puts the connection back on the test tenant after the request
+        with schema_context('public'):
+            client = Client()
+            client.force_login(User.objects.create_user('staff', is_staff=True))
+            self.assertEqual(client.get('/dev/profiles/').status_code, 404)
+
+
+# reconcile reads in worker threads, which would go to the replica
+@override_settings(DATABASE_REPLICAS=[])
+class ReconcileUsageTests(TransactionTestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.write(os.path.join(media.name, 'logo.png'), 10)
+        # tenant files are counted for their own schema
+        self.write(os.path.join(media.name, 'tenants', 'amass', 'avatar.png'), 99)
+
+    def write(self, path, size):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+
+    def test_recounts_usage(self):
+        User.objects.create_user('ama')
+        Item.objects.create(name='Chemistry')
+        Usage.objects.filter(schema_name='public').update(user_count=7, item_count=0, bytes_stored=1)
+
+        call_command('reconcile_usage', schemas=['public'], workers=1, stdout=io.StringIO())
+
+        usage = Usage.objects.get(schema_name='public')
+        self.assertEqual((usage.user_count, usage.item_count, usage.bytes_stored), (1, 1, 10))
+        self.assertIsNotNone(usage.reconciled_on)
+
+
+class StatsQueryTests(SimpleTestCase):
+
+    def quote(self, name):
+        return connection.ops.quote_name(name)
+
+    def test_totals_query(self):
+        sql, params = totals_query(['amass', 'st-mary'], self.quote)
+        self.assertEqual(sql.count(' UNION ALL '), 1)
+        self.assertIn('FROM "amass".auth_user', sql)
+        self.assertIn('FROM "st-mary".home_item', sql)
+        self.assertEqual(params, ['amass', 'st-mary'])
+
+    def test_signups_query(self):
+        since = datetime.datetime(2026, 9, 7, tzinfo=datetime.timezone.utc)
+        sql, params = signups_query(['amass', 'st-mary'], self.quote, since)
+        self.assertEqual(sql.count(' UNION ALL '), 1)
+        self.assertIn('FROM "st-mary".auth_user WHERE date_joined >= %s', sql)
+        self.assertEqual(params, ['amass', since, 'st-mary', since])
+
+
+# refresh reads in worker threads, which would go to the replica
+@override_settings(DATABASE_REPLICAS=[])
+class RefreshStatsTests(TransactionTestCase):
+
+    weeks = [datetime.date(2026, 9, 7), datetime.date(2026, 9, 14), datetime.date(2026, 9, 21)]
+
+    def setUp(self):
+        school = School(schema_name='stats', name='Stats College')
+        school.save(verbosity=0)
+        self.addCleanup(school.delete, force_drop=True)
+
+    def join(self, week, count=1):
+        with schema_context('stats'):
+            for _ in range(count):
+                joined = datetime.datetime.combine(week, datetime.time(9), tzinfo=datetime.timezone.utc)
+                User.objects.create_user(f'user{User.objects.count()}', date_joined=joined)
+
+    def signups(self):
+        return dict(WeeklySignups.objects.filter(schema_name='stats').values_list('week', 'signups'))
+
+    def test_full_refresh(self):
+        self.join(self.weeks[0], 2)
+        self.join(self.weeks[1])
+        with schema_context('stats'):
+            Item.objects.create(name='Chemistry')
+
+        self.assertEqual(refresh(full=True, chunk_size=1, workers=1), 1)
+
+        stats = SchoolStats.objects.get(schema_name='stats')
+        self.assertEqual((stats.user_count, stats.item_count), (3, 1))
+        self.assertEqual(self.signups(), {self.weeks[0]: 2, self.weeks[1]: 1})
+
+    def test_incremental_refresh_keeps_earlier_weeks(self):
+        self.join(self.weeks[0])
+        self.join(self.weeks[1])
+        refresh(full=True)
+        # earlier weeks are not recounted, this shows they were not rewritten
+        WeeklySignups.objects.filter(week=self.weeks[0]).update(signups=99)
+
+        self.join(self.weeks[1])
+        self.join(self.weeks[2], 2)
+        refresh()
+
+        self.assertEqual(self.signups(), {self.weeks[0]: 99, self.weeks[1]: 2, self.weeks[2]: 2})
+        self.assertEqual(SchoolStats.objects.get(schema_name='stats').user_count, 5)
+
+    def test_new_school_is_counted_from_the_start(self):
+        self.join(self.weeks[0])
+        self.join(self.weeks[1])
+        # other schools were counted up to a later week before this one existed
+        WeeklySignups.objects.create(schema_name='amass', week=self.weeks[2], signups=1)
+
+        refresh()
+        self.assertEqual(self.signups(), {self.weeks[0]: 1, self.weeks[1]: 1})
+
+    def test_removed_schools_are_dropped(self):
+        SchoolStats.objects.create(schema_name='closed', user_count=1, item_count=0, refreshed_on=timezone.now())
+        WeeklySignups.objects.create(schema_name='closed', week=self.weeks[0], signups=1)
+        refresh()
+        self.assertFalse(SchoolStats.objects.filter(schema_name='closed').exists())
+        self.assertFalse(WeeklySignups.objects.filter(schema_name='closed').exists())
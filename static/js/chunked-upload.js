@@ -0,0 +1,82 @@
+// Chunked, resumable uploads for <input type="file" data-chunked-upload="avatar|logo">.
+// The file is sent in slices to /uploads/, an interrupted upload resumes from
+// the last stored chunk. When done the upload id goes into the form's hidden
+// <name>_upload input and the file input is cleared, submitting the form
+// attaches the file, leaving it discards the upload.
+(function () {
+    const csrfToken = () => document.querySelector('[name=csrfmiddlewaretoken]').value;
+    const resumeKey = (purpose, file) => `upload:${purpose}:${file.name}:${file.size}:${file.lastModified}`;
+
+    async function start(purpose, file) {
+        const saved = localStorage.getItem(resumeKey(purpose, file));
+        if (saved) {
+            const response = await fetch(`/uploads/${saved}/`);
+            if (response.ok) {
+                const { offset, chunk_size } = await response.json();
+                return { id: saved, offset, chunk_size };
+            }
+        }
+        const body = new FormData();
+        body.append('purpose', purpose);
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        const response = await fetch('/uploads/', {
+            method: 'POST', body, headers: { 'X-CSRFToken': csrfToken() },
+        });
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.error);
+        localStorage.setItem(resumeKey(purpose, file), data.id);
+        return data;
+    }
+
+    async function upload(input, progress) {
+        const file = input.files[0];
+        const purpose = input.dataset.chunkedUpload;
+        let { id, offset, chunk_size: chunkSize } = await start(purpose, file);
+
+        while (offset < file.size) {
+            const response = await fetch(`/uploads/${id}/`, {
+                method: 'PUT',
+                body: file.slice(offset, offset + chunkSize),
+                headers: { 'X-CSRFToken': csrfToken(), 'X-Upload-Offset': offset },
+            });
+            const data = await response.json();
+            if (!response.ok && response.status !== 409) throw new Error(data.error);
+            offset = data.offset;
+            progress.value = offset / file.size * 100;
+        }
+        localStorage.removeItem(resumeKey(purpose, file));
+        return id;
+    }
+
+    function setup() {
+        document.querySelectorAll('input[type=file][data-chunked-upload]').forEach((input) => {
+            const uploadId = input.form.querySelector(`[name="${input.name}_upload"]`);
+            const progress = document.createElement('progress');
+            progress.max = 100;
+            progress.value = 0;
+            progress.className = 'w-full hidden';
+            input.after(progress);
+
+            input.addEventListener('change', async () => {
+                if (!input.files.length) return;
+                uploadId.value = '';
+                progress.classList.remove('hidden');
+                try {
+                    uploadId.value = await upload(input, progress);
+                } catch (error) {
+                    progress.classList.add('hidden');
+                    alert(error.message || 'Upload failed, please try again.');
+                }
+                input.value = '';
+            });
+        });
+    }
+
+    // the admin loads this script in the page head
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', setup);
+    } else {
+        setup();
+    }
+})();
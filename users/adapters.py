@@ -0,0 +1,13 @@
+from allauth.account.adapter import DefaultAccountAdapter
+from school_manager.metering import QuotaExceeded, check_user_quota
+
+
+class AccountAdapter(DefaultAccountAdapter):
+
+    def is_open_for_signup(self, request):
+        # a full school shows the signup closed page instead of failing on save
+        try:
+            check_user_quota()
+        except QuotaExceeded:
+            return False
+        return super().is_open_for_signup(request)
@@ -1,9 +1,17 @@
 from django.forms import ModelForm
 from django import forms
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import UploadedFile
+from django.urls import reverse_lazy
+from home.uploads import ChunkedUploadMixin, check_image_header
+from school_manager.metering import check_storage_quota, QuotaExceeded
 from .models import Profile
 
-class ProfileForm(ModelForm):
+class ProfileForm(ChunkedUploadMixin, ModelForm):
+    image_upload = forms.UUIDField(required=False, widget=forms.HiddenInput)
+    chunked_uploads = {'image': 'avatar'}
+
     class Meta:
         model = Profile
         fields = ['image', 'displayname', 'info' ]
@@ -12,10 +20,35 @@ class ProfileForm(ModelForm):
             'displayname' : forms.TextInput(attrs={'placeholder': 'Add display name'}),
             'info' : forms.Textarea(attrs={'rows':3, 'placeholder': 'Add information'})
         }
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            if image.size > settings.UPLOAD_MAX_SIZE:
+                raise forms.ValidationError('File too large.')
+            check_image_header(image)
+            try:
+                check_storage_quota(image.size)
+            except QuotaExceeded as e:
+                raise forms.ValidationError(str(e))
+        return image
+
+    def get_upload_user(self):
+        return self.instance.user
         
         
+def availability_attrs(target):
+    # debounced HTMX check against profile_availability
+    return {
+        'hx-get': reverse_lazy('profile-availability'),
+        'hx-trigger': 'input changed delay:400ms',
+        'hx-target': target,
+        'hx-swap': 'innerHTML',
+    }
+
+
 class EmailForm(ModelForm):
-    email = forms.EmailField(required=True)
+    email = forms.EmailField(required=True, widget=forms.EmailInput(attrs=availability_attrs('#email-availability')))
 
     class Meta:
         model = User
@@ -26,3 +59,12 @@ class UsernameForm(ModelForm):
     class Meta:
         model = User
         fields = ['username']
+        widgets = {
+            'username': forms.TextInput(attrs=availability_attrs('#username-availability')),
+        }
+
+    def clean_username(self):
+        username = self.cleaned_data['username']
+        if User.objects.filter(username__lower=username.lower()).exclude(id=self.instance.id).exists():
+            raise forms.ValidationError('Username already in use')
+        return username
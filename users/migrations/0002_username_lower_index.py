@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    # auth.User can't carry extra Meta indexes, so the functional indexes are raw SQL
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE UNIQUE INDEX IF NOT EXISTS auth_user_username_lower_uniq "
+                "ON auth_user (lower(username));",
+            reverse_sql="DROP INDEX IF EXISTS auth_user_username_lower_uniq;",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX IF NOT EXISTS auth_user_email_lower_idx "
+                "ON auth_user (lower(email));",
+            reverse_sql="DROP INDEX IF EXISTS auth_user_email_lower_idx;",
+        ),
+    ]
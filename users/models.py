@@ -1,7 +1,13 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.conf import settings
 
+# username__lower / email__lower compile to lower(col) and hit the functional indexes,
+# registered on these two fields only rather than on every CharField
+User._meta.get_field('username').register_lookup(Lower)
+User._meta.get_field('email').register_lookup(Lower)
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     image = models.ImageField(upload_to='avatars/', null=True, blank=True)
@@ -1,7 +1,8 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from allauth.account.models import EmailAddress
 from django.contrib.auth.models import User
+from school_manager import metering
 from .models import Profile
 
 @receiver(post_save, sender=User)       
@@ -13,6 +14,7 @@ def user_postsave(sender, instance, created, **kwargs):
         Profile.objects.create(
             user = user,
         )
+        metering.adjust(users=1)
     else:
         # update allauth emailaddress if exists 
         try:
@@ -34,4 +36,11 @@ def user_postsave(sender, instance, created, **kwargs):
 @receiver(pre_save, sender=User)
 def user_presave(sender, instance, **kwargs):
     if instance.username:
-        instance.username = instance.username.lower()
\ No newline at end of file
+        instance.username = instance.username.lower()
+    if instance._state.adding:
+        metering.check_user_quota()
+
+
+@receiver(post_delete, sender=User)
+def user_postdelete(sender, instance, **kwargs):
+    metering.adjust(users=-1)
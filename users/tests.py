@@ -1,3 +1,84 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.exceptions import FieldError
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.test.client import TenantClient
+from school_manager.models import School
+from .models import Profile
 
-# Create your tests here.
+
+class LowerLookupTests(TenantTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('kofi', 'Kofi.Mensah@Example.com')
+        # the pre_save signal lowercases usernames, older rows may not be
+        User.objects.filter(pk=self.user.pk).update(username='Kofi')
+
+    def test_username_lower(self):
+        self.assertTrue(User.objects.filter(username__lower='kofi').exists())
+        self.assertFalse(User.objects.filter(username='kofi').exists())
+
+    def test_email_lower(self):
+        self.assertTrue(User.objects.filter(email__lower='kofi.mensah@example.com').exists())
+
+    def test_lookup_compiles_to_lower(self):
+        sql = str(User.objects.filter(username__lower='kofi').query)
+        self.assertIn('LOWER("auth_user"."username")', sql)
+
+    def test_lookup_is_only_on_user_fields(self):
+        with self.assertRaises(FieldError):
+            Profile.objects.filter(displayname__lower='kofi').exists()
+
+    def test_usernames_unique_ignoring_case(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.filter(pk=User.objects.create_user('ama').pk).update(username='KOFI')
+
+
+class AvailabilityViewTests(TenantTestCase):
+
+    def setUp(self):
+        self.client = TenantClient(self.tenant)
+        self.user = User.objects.create_user('ama', 'ama@example.com')
+        User.objects.create_user('kofi', 'Kofi@Example.com')
+        self.url = reverse('profile-availability')
+
+    def check(self, **params):
+        return self.client.get(self.url, params).content.decode()
+
+    def test_requires_login(self):
+        response = self.client.get(self.url, {'username': 'kofi'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('account_login'), response['Location'])
+
+    def test_get_only(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(self.url, {'username': 'kofi'}).status_code, 405)
+
+    def test_taken_ignoring_case(self):
+        self.client.force_login(self.user)
+        self.assertIn('Username already in use', self.check(username='KOFI'))
+        self.assertIn('Email already in use', self.check(email='kofi@example.com'))
+
+    def test_available(self):
+        self.client.force_login(self.user)
+        self.assertIn('Username available', self.check(username='yaw'))
+
+    def test_own_values_are_available(self):
+        self.client.force_login(self.user)
+        self.assertIn('Username available', self.check(username='Ama'))
+        self.assertIn('Email available', self.check(email='AMA@example.com'))
+
+    def test_blank_value_renders_nothing(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.check(username='  ').strip(), '')
+
+
+class SignupQuotaTests(TenantTestCase):
+
+    def test_signup_closed_when_school_is_full(self):
+        client = TenantClient(self.tenant)
+        self.assertNotContains(client.get(reverse('account_signup')), 'Sign Up Closed')
+        School.objects.filter(pk=self.tenant.pk).update(max_users=1)
+        User.objects.create_user('ama')
+        self.assertContains(client.get(reverse('account_signup')), 'Sign Up Closed')
@@ -8,6 +8,7 @@ urlpatterns = [
     path('settings/', profile_settings_view, name="profile-settings"),
     path('emailchange/', profile_emailchange, name="profile-emailchange"),
     path('usernamechange/', profile_usernamechange, name="profile-usernamechange"),
+    path('availability/', profile_availability, name="profile-availability"),
     path('emailverify/', profile_emailverify, name="profile-emailverify"),
     path('delete/', profile_delete_view, name="profile-delete"),
 ]
@@ -6,11 +6,13 @@ from django.contrib.auth import logout
 from django.contrib.auth.models import User
 from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
+from django.views.decorators.http import require_GET
+from audit.events import record
 from .forms import *
 
 def profile_view(request, username=None):
     if username:
-        profile = get_object_or_404(User, username=username).profile
+        profile = get_object_or_404(User, username__lower=username.lower()).profile
     else:
         try:
             profile = request.user.profile
@@ -27,6 +29,7 @@ def profile_edit_view(request):
         form = ProfileForm(request.POST, request.FILES, instance=request.user.profile)
         if form.is_valid():
             form.save()
+            record(request, 'profile.edit', request.user.profile, fields=form.changed_data)
             return redirect('profile')
         
     if request.path == reverse('profile-onboarding'):
@@ -50,17 +53,19 @@ def profile_emailchange(request):
         return render(request, 'partials/email_form.html', {'form':form})
     
     if request.method == 'POST':
+        old_email = request.user.email
         form = EmailForm(request.POST, instance=request.user)
 
         if form.is_valid():
             
             # Check if the email already exists
             email = form.cleaned_data['email']
-            if User.objects.filter(email=email).exclude(id=request.user.id).exists():
+            if User.objects.filter(email__lower=email.lower()).exclude(id=request.user.id).exists():
                 messages.warning(request, f'{email} is already in use.')
                 return redirect('profile-settings')
             
             form.save() 
+            record(request, 'email.change', request.user, old=old_email, new=email)
             
             # Then Signal updates emailaddress and set verified to False
             
@@ -83,10 +88,12 @@ def profile_usernamechange(request):
         return render(request, 'partials/username_form.html', {'form':form})
     
     if request.method == 'POST':
+        old_username = request.user.username
         form = UsernameForm(request.POST, instance=request.user)
         
         if form.is_valid():
             form.save()
+            record(request, 'username.change', request.user, old=old_username, new=request.user.username)
             messages.success(request, 'Username updated successfully.')
             return redirect('profile-settings')
         else:
@@ -96,6 +103,23 @@ def profile_usernamechange(request):
     return redirect('profile-settings')    
 
 
+@login_required
+@require_GET
+def profile_availability(request):
+    # one probe against the lower() index per keystroke batch
+    if 'username' in request.GET:
+        field, value = 'username', request.GET['username'].strip()
+    else:
+        field, value = 'email', request.GET.get('email', '').strip()
+
+    available = None
+    if value:
+        users = User.objects.filter(**{f'{field}__lower': value.lower()}).exclude(id=request.user.id)
+        available = not users.exists()
+
+    return render(request, 'partials/availability.html', {'field':field, 'available':available})
+
+
 @login_required
 def profile_emailverify(request):
     send_email_confirmation(request, request.user)
@@ -106,6 +130,7 @@ def profile_emailverify(request):
 def profile_delete_view(request):
     user = request.user
     if request.method == "POST":
+        record(request, 'user.delete', user, email=user.email)
         logout(request)
         user.delete()
         messages.success(request, 'Account deleted, what a pity')